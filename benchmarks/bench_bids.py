@@ -0,0 +1,73 @@
+"""Bid history parsing: parse_bid_records (one compiled regex and
+vectorized string ops over the text of every row) against the old
+per-row record_parser (str() of each row, a new HTMLParser, splits on
+'$' and a hand split date).
+
+Runs over the viewbids fixtures, parsed once with bs4; finding the rows
+is timed as part of both. The users and amounts of both parses are
+compared first.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_bids [repeat]
+"""
+import re
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import fixture_pages, median_time, parsed_text
+from data_collection.parsing import find_all_class, node_text, parse_html
+from data_collection.request import parse_bid_records
+
+ROW_CLASS = 'ui-component-table_tr_detailinfo'
+
+
+def old_bidding_history(soup, item_id) -> pd.DataFrame:
+    """The per-row parse of the old Item.get_bidding_history."""
+    def record_parser(record):
+        if 'Cancelled' in record or 'Retracted' in record:
+            return None
+        bid_data = parsed_text(record)
+        bid_user = bid_data[:5]
+        feedback_chunk, amt_time_chunk = bid_data.split('$')
+        if bid_user.lower() == 'start':
+            user_score = np.nan
+        else:
+            user_score = feedback_chunk.split('(')[-1].split()[-1][:-1]
+        dollar_dec_loc = amt_time_chunk.find('.')
+        bid_amt = amt_time_chunk[:dollar_dec_loc + 3]
+        if re.search('[a-zA-Z]', bid_amt):
+            bid_amt = '0.00'
+        date, time = amt_time_chunk[dollar_dec_loc + 3:].split('at')
+        return bid_user, user_score, bid_amt, f'{date.strip()} {time.strip()[:-3]}'
+
+    records = [record_parser(str(record)) for record in soup.find_all(class_=ROW_CLASS)]
+    df_records = pd.DataFrame([record for record in records if record],
+                              columns=['user_id', 'score', 'bid', 'datetime'])
+    df_records['id'] = item_id
+    return df_records[['id', 'user_id', 'score', 'bid', 'datetime']]
+
+
+def new_bidding_history(soup, item_id) -> pd.DataFrame:
+    """The row lookup and parse of Item.get_bidding_history."""
+    return parse_bid_records([node_text(record) for record in find_all_class(soup, ROW_CLASS)], item_id)
+
+
+def main(repeat=20):
+    print(f'Bid history parse on a parsed bs4 soup, median of {repeat}')
+    for name, page in fixture_pages('viewbids'):
+        soup = parse_html(page, 'bs4')
+        old, new = old_bidding_history(soup, 1), new_bidding_history(soup, 1)
+        if old.user_id.tolist() != new.user_id.tolist() or \
+                not np.allclose(old.bid.str.replace(',', '').astype(float), new.bid):
+            raise AssertionError(f'{name}: parsed bids differ')
+        old_time = median_time(lambda: old_bidding_history(soup, 1), repeat)
+        new_time = median_time(lambda: new_bidding_history(soup, 1), repeat)
+        print(f'  {name:<16} {len(new):5} bids | per-row parser {old_time * 1000:7.2f} ms | '
+              f'vectorized {new_time * 1000:7.2f} ms | x{old_time / new_time:.2f}')
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,76 @@
+"""Writes/sec of small transactions through the pooled get_cursor
+against a new connection per write (the way get_cursor worked before
+the pool), sequentially and from several threads at once.
+
+Needs the Postgres server configured in conf.yaml. Rows go to a
+scratch table, bench_writes, which is dropped at the end. The threaded
+run uses twice db_pool_max threads, so it also checks that callers
+wait for a free connection instead of failing.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_db_writes [writes] [threads]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data_collection import req_to_db as rdb
+
+TABLE = 'bench_writes'
+INSERT = f"INSERT INTO {TABLE} (id, payload) VALUES (%s, %s);"
+
+
+@rdb.get_cursor
+def setup(cur=None):
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+    cur.execute(f"CREATE TABLE {TABLE} (id BIGINT, payload TEXT);")
+
+
+@rdb.get_cursor
+def teardown(cur=None):
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+
+
+def connect_per_write(i):
+    conn = rdb.psql_connect(rdb.config, rdb.secrets)
+    try:
+        with conn:
+            with conn.cursor() as cur:
+                cur.execute(INSERT, (i, 'x' * 100))
+    finally:
+        conn.close()
+
+
+@rdb.get_cursor
+def pooled_write(i, cur=None):
+    cur.execute(INSERT, (i, 'x' * 100))
+
+
+def rate(write, n, threads):
+    """Writes/sec for n calls of write on threads threads."""
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(write, range(n)))
+    else:
+        for i in range(n):
+            write(i)
+    return n / (time.perf_counter() - start)
+
+
+def main(n=1000, threads=2 * rdb.get_pool().maxconn):
+    setup()
+    try:
+        print(f'{n} single-row write transactions, db_pool_max={rdb.get_pool().maxconn}')
+        for t in sorted({1, threads}):
+            fresh = rate(connect_per_write, n, t)
+            pooled = rate(pooled_write, n, t)
+            print(f'  {t:>3} thread(s): new connection {fresh:8.0f} writes/s | '
+                  f'pooled {pooled:8.0f} writes/s | x{pooled / fresh:.2f}')
+    finally:
+        teardown()
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,67 @@
+"""Item page field extraction: the single pass of Item.nodes
+(parsing.extract_nodes) against the old getters, which ran one full
+tree find_all per field and re-parsed each match with an HTMLParser.
+
+Both run on the same already parsed bs4 soup of each item fixture, so
+only extraction is timed. The seller description is left out of both,
+since it lives on a separate page. The extracted values are compared
+first, so a speedup can't come from skipping work.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_extract [repeat]
+"""
+import sys
+
+from benchmarks.common import fixture_pages, median_time, parsed_text
+from data_collection.parsing import parse_html
+from data_collection.request import Item
+
+
+def old_item_data(soup, bid_soup) -> tuple:
+    """The per-field find_all + HTMLParser extraction of the old getters."""
+    def rm_commas(s): return ''.join(s.split(','))
+
+    price = float(rm_commas(parsed_text(soup.find_all(class_='notranslate')[0]).split()[1][1:]))
+    cond = parsed_text(soup.find_all(class_='condText')[0])
+    bundle_text = parsed_text(soup.find_all(class_='prodDetailSec')[0])
+    bundle = 'No' if 'No\n' in bundle_text else 'Yes' if 'Yes\n' in bundle_text else 'N/A'
+    seller_percent = float(parsed_text(soup.find(id='si-fb')).split('%')[0])
+    seller_score = int(parsed_text(soup.find_all(class_='mbg-l')[0]).strip().split('\n')[0][1:])
+    rating_count = int(rm_commas(parsed_text(soup.find_all(class_='prodreview')[0]).split()[0]))
+    thumbs = [str(thumb) for thumb in soup.find_all(class_='tdThumb')]
+    images = set()
+    for thumb in thumbs:
+        mark_1 = thumb.find("https://i.ebayimg.com/images/g/")
+        mark_2 = thumb[mark_1:].find('"')
+        images.add(thumb[mark_1: mark_1 + mark_2].replace('s-l64', 's-l1600'))
+    bid_summary = parsed_text(bid_soup.find_all(class_='app-bid-info_wrapper')[0])
+    return (price, cond, bundle, seller_percent, seller_score, rating_count,
+            bid_summary, bid_summary.split('Duration:')[-1]), sorted(images)
+
+
+def new_item_data(soup, bid_soup) -> tuple:
+    """Item.get_item_data over a fresh Item, so the node cache is cold."""
+    item = Item(0)
+    item.soup = soup
+    item.bid_soup = bid_soup
+    record = item.get_item_data(main_text=False, size='full')
+    return record[1:4] + record[5:], [url for url, _ in item.image_sources]
+
+
+def main(repeat=50):
+    bid_soup = parse_html(fixture_pages('viewbids')[0][1], 'bs4')
+    print(f'Item page extraction on a parsed bs4 soup, median of {repeat}')
+    for name, page in fixture_pages('item'):
+        soup = parse_html(page, 'bs4')
+        old, new = old_item_data(soup, bid_soup), new_item_data(soup, bid_soup)
+        if old != new:
+            raise AssertionError(f'{name}: extracted fields differ\n  old: {old}\n  new: {new}')
+        old_time = median_time(lambda: old_item_data(soup, bid_soup), repeat)
+        new_time = median_time(lambda: new_item_data(soup, bid_soup), repeat)
+        print(f'  {name:<16} {len(page) / 1024:5.0f} KiB | per-field find_all {old_time * 1000:7.2f} ms | '
+              f'single pass {new_time * 1000:7.2f} ms | x{old_time / new_time:.2f}')
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""Import-time check for data_collection.request.
+
+Importing the module must not touch the network: every socket connect
+is patched to raise before the import, so any request made at import
+time fails the check. Each run is a fresh interpreter. Third party
+imports (pandas, bs4, ...) are timed separately from the project's own
+module code, which should take milliseconds.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_import [runs]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+CHILD = r'''
+import socket
+import time
+
+def no_network(*args, **kwargs):
+    raise AssertionError(f'network access during import: {args[1:]}')
+
+socket.socket.connect = no_network
+socket.socket.connect_ex = no_network
+socket.create_connection = no_network
+
+start = time.perf_counter()
+import bs4, lxml.html, numpy, pandas, requests, yaml
+deps = time.perf_counter()
+import data_collection.request
+end = time.perf_counter()
+print(deps - start, end - deps)
+'''
+
+
+def time_import():
+    """Imports data_collection.request in a new interpreter.
+    Returns:
+        (float, float) of seconds spent on third party imports
+        and on the project's own modules."""
+    result = subprocess.run([sys.executable, '-c', CHILD], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr)
+    deps, own = map(float, result.stdout.split())
+    return deps, own
+
+
+def main(runs=5):
+    times = [time_import() for _ in range(runs)]
+    deps = statistics.median(t[0] for t in times)
+    own = statistics.median(t[1] for t in times)
+    print('import data_collection.request, no network access allowed')
+    print(f'  third party imports: {deps * 1000:8.1f} ms (median of {runs})')
+    print(f'  project modules:     {own * 1000:8.1f} ms (median of {runs})')
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,86 @@
+"""Image label preparation: the vectorized expand_feature_string (one
+uint8 byte view of all label strings) and feature_group (str.extract of
+the item id) against the old versions, seven .str[i].astype(int) passes
+and a row-wise DataFrame.apply over the image names.
+
+Runs on a synthetic labels.csv in the layout image_labeling writes
+(img_name_index, img_name, features), with one to six images per item,
+read the way get_df_labels reads it. The grouped labels of both are
+compared before timing.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_labels [rows] [repeat]
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import median_time
+from data_readiness.image_labeling import features
+from data_readiness.label_df_cleaning import expand_feature_string, feature_group
+
+
+def write_labels(path, rows, seed=0):
+    """Writes rows synthetic image labels to path."""
+    rng = np.random.default_rng(seed)
+    per_item = rng.integers(1, 7, size=rows)
+    items = np.repeat(rng.integers(10 ** 11, 10 ** 12, size=rows), per_item)[:rows]
+    image = np.concatenate([np.arange(n) for n in per_item])[:rows]
+    bits = rng.integers(0, 2, size=(rows, len(features))).astype(str)
+    names = [f'{item}full_{i}.jpg' for item, i in zip(items, image)]
+    df = pd.DataFrame({'img_name': names, 'features': [''.join(b) for b in bits]},
+                      index=pd.Index(names, name='img_name_index'))
+    df.to_csv(path)
+    return None
+
+
+def read_labels(path) -> pd.DataFrame:
+    """get_df_labels on path."""
+    return pd.read_csv(path, index_col=0, dtype={'features': str}).reset_index(drop=True)
+
+
+def old_expand_feature_string(df):
+    for i, feature in enumerate(features):
+        df[feature] = df.features.str[i].astype(int)
+    del df["features"]
+    return df
+
+
+def old_feature_group(df):
+    def trunc_img_name(text):
+        return text[:text.find('full')]
+
+    df['item'] = df.apply(lambda row: trunc_img_name(row['img_name']), axis=1)
+    df = df.drop(columns='img_name')
+    return df.groupby(by='item').max().reset_index()
+
+
+def main(rows=500000, repeat=3):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'labels.csv')
+        write_labels(path, rows)
+        labels = read_labels(path)
+    old = old_feature_group(old_expand_feature_string(labels.copy()))
+    new = feature_group(expand_feature_string(labels.copy()))
+    pd.testing.assert_frame_equal(old, new, check_dtype=False)
+
+    expanded = {'old': old_expand_feature_string(labels.copy()), 'new': expand_feature_string(labels.copy())}
+    times = {
+        'expand_feature_string': (median_time(lambda: old_expand_feature_string(labels.copy()), repeat),
+                                  median_time(lambda: expand_feature_string(labels.copy()), repeat)),
+        'feature_group': (median_time(lambda: old_feature_group(expanded['old'].copy()), repeat),
+                          median_time(lambda: feature_group(expanded['new'].copy()), repeat)),
+    }
+    times['both'] = tuple(map(sum, zip(*times.values())))
+    print(f'{rows:,} image labels of {len(new):,} items, median of {repeat}')
+    for step, (old_time, new_time) in times.items():
+        print(f'  {step:<22} old {old_time * 1000:8.1f} ms | vectorized {new_time * 1000:7.1f} ms | '
+              f'x{old_time / new_time:.1f}')
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""Parse time and memory per page for each parser backend
+(data_collection.parsing.BACKENDS) over the fixture corpus.
+
+Time is the median of repeated parse_html calls. Memory is the growth
+in resident set size while holding keep parsed copies of a page,
+divided by keep, measured in a freshly spawned process so memory freed
+by earlier parses can't be reused. tracemalloc would miss the lxml
+trees, which are allocated by libxml2 outside of Python's allocator.
+Reads /proc/self/statm, so memory is only reported on Linux.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_parse [repeat] [keep]
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+from benchmarks.common import fixture_pages, median_time
+from data_collection.parsing import BACKENDS, parse_html
+
+KINDS = ('search', 'item', 'desc', 'viewbids')
+
+
+def rss() -> int:
+    """Resident set size of this process in bytes, or 0 off Linux."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return 0
+
+
+def tree_memory(page: str, backend: str, keep=20) -> float:
+    """Bytes of resident memory per parsed tree of page."""
+    parse_html(page, backend)  # Warm up the parser outside the measurement.
+    gc.collect()
+    before = rss()
+    trees = [parse_html(page, backend) for _ in range(keep)]
+    return (rss() - before) / len(trees)
+
+
+def fresh_tree_memory(page: str, backend: str, keep=20) -> float:
+    """tree_memory, run in a new interpreter."""
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(tree_memory, (page, backend, keep))
+
+
+def main(repeat=20, keep=20):
+    print(f'parse_html per page: median time of {repeat}, resident memory per tree over {keep} copies')
+    print(f'  {"page":<16} {"KiB":>5} ' + ''.join(f'| {b + " ms":>9} {b + " MiB":>10} ' for b in BACKENDS))
+    for kind in KINDS:
+        for name, page in fixture_pages(kind):
+            row = f'  {name:<16} {len(page) / 1024:5.0f} '
+            for backend in BACKENDS:
+                seconds = median_time(lambda: parse_html(page, backend), repeat)
+                row += f'| {seconds * 1000:9.2f} {fresh_tree_memory(page, backend, keep) / 2 ** 20:10.2f} '
+            print(row)
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,100 @@
+"""Peak resident memory of reading a synthetic main-like table:
+
+    read_sql         the old reader, pd.read_sql of the whole table
+    psql_to_pandas   named cursor chunks and compact dtypes, one frame
+    iter_chunks      psql_iter_chunks consumed a chunk at a time
+    stream_snapshot  the snapshot refresh of sync_table, streamed to Parquet
+
+Each mode runs in a freshly spawned process, and the growth of its peak
+RSS over the RSS after imports is reported. Needs the Postgres server
+configured in conf.yaml; the scratch table bench_main is made with
+main's schema and dropped at the end.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_read_db [rows]
+"""
+import multiprocessing
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+
+from data_collection import req_to_db as rdb
+from data_readiness import read_db
+
+TABLE = 'bench_main'
+MODES = ('read_sql', 'psql_to_pandas', 'iter_chunks', 'stream_snapshot')
+
+
+@rdb.get_cursor
+def setup(rows, cur=None):
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+    rdb.mk_main_tbl.__wrapped__(cur=cur, table=TABLE)
+    cur.execute(f"""INSERT INTO {TABLE} SELECT
+        g, (random() * 100)::NUMERIC(6,2),
+        (ARRAY['Used', 'Like New', 'Very Good', 'Good', 'Acceptable'])[1 + g %% 5],
+        (ARRAY['No', 'Yes', 'N/A'])[1 + g %% 3],
+        repeat(md5(g::text), 6),
+        (90 + random() * 10)::NUMERIC(4,1),
+        CASE WHEN g %% 7 = 0 THEN NULL ELSE (random() * 10000)::INT END,
+        CASE WHEN g %% 3 = 0 THEN NULL ELSE (random() * 500)::INT END,
+        'Winning bid: US $' || g %% 100 || '.00 Bids: ' || g %% 40 || ' Duration: 7 days',
+        ' 7 days'
+        FROM generate_series(1, %s) g;""", (rows, ))
+
+
+@rdb.get_cursor
+def teardown(cur=None):
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE};")
+
+
+def current_rss() -> int:
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+def run(mode):
+    """Reads TABLE with mode in this process.
+    Returns:
+        (float, float) of seconds and peak RSS growth in bytes."""
+    query = f'SELECT * FROM {TABLE};'
+    before = current_rss()
+    start = time.perf_counter()
+    if mode == 'read_sql':
+        conn = rdb.psql_connect(rdb.config, rdb.secrets)
+        try:
+            df = pd.read_sql(query, conn)
+        finally:
+            conn.close()
+    elif mode == 'psql_to_pandas':
+        df = read_db.psql_to_pandas(query, dtypes=read_db.dtypes['main'])
+    elif mode == 'iter_chunks':
+        total = 0.0
+        for chunk in read_db.psql_iter_chunks(query, dtypes=read_db.dtypes['main']):
+            total += chunk.price.sum()
+    else:
+        read_db.stream_snapshot(TABLE, read_db.table_oid(TABLE), read_db.dtypes['main'])
+        os.remove(os.path.join(read_db.snapshot_path, f'{TABLE}.parquet'))
+    seconds = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024  # KiB on Linux.
+    return seconds, peak - before
+
+
+def main(rows=1000000):
+    print(f'Making {TABLE} with {rows:,} rows...')
+    setup(rows)
+    try:
+        print(f'Reading {rows:,} rows, peak RSS growth per mode (fresh process each)')
+        for mode in MODES:
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                seconds, peak = pool.apply(run, (mode, ))
+            print(f'  {mode:<16} {peak / 2 ** 20:9.1f} MiB {seconds:8.1f} s')
+    finally:
+        teardown()
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
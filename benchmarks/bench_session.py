@@ -0,0 +1,81 @@
+"""Requests/sec of a fresh connection per request (requests.get) against
+the shared keep-alive session (proxy_request.get_session).
+
+A stand-in server (stdlib http.server, HTTP/1.1 keep-alive) runs on a
+thread on localhost and answers every GET with a small html body, so
+the numbers show connection setup overhead only. On the real Zenscrape
+endpoint each new connection also pays for DNS and a TLS handshake,
+so the gap there is larger.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_session [requests] [threads]
+"""
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from data_collection.proxy_request import get_session
+
+BODY = b'<html><body>' + b'<div class="notranslate">US $12.34</div>' * 100 + b'</body></html>'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def rate(get, url, n, threads):
+    """Requests/sec for n GETs of url made with get on threads threads."""
+    def fetch(_):
+        response = get(url)
+        response.raise_for_status()
+        return len(response.content)
+
+    start = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(fetch, range(n)))
+    else:
+        for i in range(n):
+            fetch(i)
+    return n / (time.perf_counter() - start)
+
+
+def main(n=2000, threads=10):
+    server = start_server()
+    url = f'http://127.0.0.1:{server.server_address[1]}/itm/1'
+    session = get_session()
+    session.get(url)  # Warm up the pool.
+    print(f'{n} GETs against a local keep-alive server')
+    for t in sorted({1, threads}):
+        fresh = rate(requests.get, url, n, t)
+        shared = rate(session.get, url, n, t)
+        print(f'  {t:>3} thread(s): requests.get {fresh:8.0f} req/s | '
+              f'shared session {shared:8.0f} req/s | x{shared / fresh:.2f}')
+    server.shutdown()
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
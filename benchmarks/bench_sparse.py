@@ -0,0 +1,63 @@
+"""Memory and file size of the NLP features, dense against sparse:
+
+    dense   the old get_nlp_df frame of float64 columns (X.toarray()),
+            written out with the rest of train.csv
+    sparse  the pandas sparse columns of get_nlp_df, written to the
+            train_nlp.npz side-car by write_sparse_frame
+
+Features come from the tf-idf settings of fit_vectorizer on synthetic
+descriptions: a few hundred common listing words plus a Zipf-distributed
+tail, so document frequencies and density resemble short listings. The
+sparse file is read back with read_sparse_frame and compared with the
+dense frame before anything is reported.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_sparse [n]
+"""
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from modeling.prep import read_sparse_frame, write_sparse_frame
+
+
+def descriptions(n, vocab=20000, seed=0) -> list:
+    """n synthetic descriptions of 20 to 150 words over a Zipf vocabulary."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f'w{i}' for i in range(vocab)])
+    texts = []
+    for length in rng.integers(20, 150, size=n):
+        ranks = rng.zipf(1.3, size=length)
+        texts.append(' '.join(words[ranks[ranks < vocab]]))
+    return texts
+
+
+def main(n=20000):
+    texts = descriptions(n)
+    vectorizer = TfidfVectorizer(min_df=0.02, max_df=0.65, ngram_range=(1, 2))
+    X = vectorizer.fit_transform(texts)
+    columns = sorted(vectorizer.vocabulary_, key=vectorizer.vocabulary_.get)
+    dense = pd.DataFrame(X.toarray(), columns=columns)
+    sparse = pd.DataFrame.sparse.from_spmatrix(X, columns=columns)
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_file, npz_file = os.path.join(tmp, 'train.csv'), os.path.join(tmp, 'train_nlp.npz')
+        dense.to_csv(csv_file)
+        write_sparse_frame(sparse, npz_file)
+        if not np.allclose(read_sparse_frame(npz_file).sparse.to_dense().values, dense.values):
+            raise AssertionError('sparse round trip differs from the dense features')
+        sizes = os.path.getsize(csv_file), os.path.getsize(npz_file)
+    memory = dense.memory_usage(deep=True).sum(), sparse.memory_usage(deep=True).sum()
+    print(f'NLP features of {n:,} descriptions: {X.shape[1]} columns, {X.nnz / np.prod(X.shape):.1%} non-zero')
+    print(f'  {"":<14} {"dense":>10} {"sparse":>10}')
+    print(f'  {"frame MiB":<14} {memory[0] / 2 ** 20:10.1f} {memory[1] / 2 ** 20:10.1f} | x{memory[0] / memory[1]:.1f}')
+    print(f'  {"file MiB":<14} {sizes[0] / 2 ** 20:10.1f} {sizes[1] / 2 ** 20:10.1f} | x{sizes[0] / sizes[1]:.1f}'
+          f'  (csv vs npz)')
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,82 @@
+"""Description preprocessing: preprocess_texts (one pass per description
+over a module level stopword set and a memoized lemmatizer, optionally
+across a process pool) against the old nlp_preprocess chain of
+DataFrame.apply steps, which re-read the stopword corpus with
+stopwords.words('english') for every token.
+
+Runs on synthetic listing descriptions drawn from a fixed vocabulary,
+so a run is repeatable. The old chain is slow enough that it is only
+timed on the first old_n descriptions and reported per 1000. The
+outputs of both are compared on those descriptions first. The lemma
+cache is cleared before each in-process run, so every run starts
+cold.
+
+Usage (from the repo root):
+    python -m benchmarks.bench_text [n] [old_n] [repeat]
+"""
+import random
+import string
+import sys
+
+import pandas as pd
+from nltk.corpus import stopwords
+
+from benchmarks.common import median_time
+from data_readiness.text_preprocess import lemmatize, lemmatizer, preprocess_texts, tokenizer
+
+WORDS = ('super smash bros melee nintendo gamecube game disc discs case cases manual manuals '
+         'original tested works working great good condition scratches scratch light minor '
+         'cover art included not no only the a an and with of for is it this in on to has '
+         'shipping ships fast free players controllers controller memory card cards box boxes '
+         'authentic genuine cleaned plays perfectly resurfaced sticker stickers label labels').split()
+
+
+def descriptions(n, seed=0) -> list:
+    """n synthetic descriptions of 20 to 150 words with punctuation."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(WORDS) + (rng.choice(string.punctuation) if rng.random() < 0.1 else '')
+                 for _ in range(rng.randint(20, 150))]
+        texts.append(' '.join(words).capitalize())
+    return texts
+
+
+def old_preprocess(texts) -> list:
+    """The per-step apply chain of the old nlp_preprocess."""
+    def remove_punctuation(text):
+        return "".join([c for c in text if c not in string.punctuation])
+
+    def remove_stops(text):
+        return [w for w in text if (w not in stopwords.words('english') or w in ['not', 'no'])]
+
+    def word_lemmatizer(text):
+        return [lemmatizer.lemmatize(i) for i in text]
+
+    text_df = pd.Series(texts).apply(remove_punctuation)
+    text_df = text_df.apply(lambda x: tokenizer.tokenize(x.lower()))
+    text_df = text_df.apply(word_lemmatizer)
+    text_df = text_df.apply(remove_stops)
+    return [" ".join(x) for x in text_df]
+
+
+def new_preprocess(texts, n_jobs) -> list:
+    lemmatize.cache_clear()
+    return preprocess_texts(texts, n_jobs=n_jobs)
+
+
+def main(n=5000, old_n=200, repeat=3):
+    texts = descriptions(n)
+    if old_preprocess(texts[:old_n]) != new_preprocess(texts[:old_n], 1):
+        raise AssertionError('preprocessed descriptions differ')
+    print(f'Preprocessing {n:,} synthetic descriptions, median of {repeat} (old chain on the first {old_n})')
+    old_time = median_time(lambda: old_preprocess(texts[:old_n]), repeat) / old_n * 1000
+    print(f'  {"old apply chain":<22} {old_time:8.3f} s per 1000')
+    for name, n_jobs in (('preprocess_texts', 1), ('preprocess_texts pool', None)):
+        new_time = median_time(lambda: new_preprocess(texts, n_jobs), repeat) / n * 1000
+        print(f'  {name:<22} {new_time:8.3f} s per 1000 | x{old_time / new_time:.1f}')
+    return None
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,46 @@
+import glob
+import os
+import statistics
+import time
+from html.parser import HTMLParser
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def fixture_pages(kind: str) -> list:
+    """Html fixtures of one kind ('search', 'item', 'desc' or 'viewbids').
+    Returns:
+        [(str, str), ...] of (file name, html), sorted by name."""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES, f'{kind}_*.html'))):
+        with open(path) as f:
+            pages.append((os.path.basename(path), f.read()))
+    if not pages:
+        raise FileNotFoundError(f'No {kind} fixtures in {FIXTURES}; run python -m benchmarks.make_fixtures')
+    return pages
+
+
+def median_time(f, repeat=20) -> float:
+    """Median wall time of f() in seconds, over repeat calls."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+class ItemCountParser(HTMLParser):
+    """The HTMLParser the scraper used to get text back out of
+    stringified soup nodes, kept here for the before/after runs."""
+    data_sentence = ''
+
+    def handle_data(self, data):
+        self.data_sentence += data
+
+
+def parsed_text(node) -> str:
+    """Text of a bs4 node the old way: str() it and re-parse it."""
+    parser = ItemCountParser()
+    parser.feed(str(node))
+    return parser.data_sentence
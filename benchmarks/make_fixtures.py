@@ -0,0 +1,158 @@
+"""Writes the html fixture corpus in benchmarks/fixtures/.
+
+The pages are reconstructed, not saved from ebay: each carries the
+markup the scraper reads (the classes and ids in
+data_collection.parsing, the search result links, the description div
+and the viewbids table) inside a page of realistic bulk, i.e. header,
+navigation, inline scripts and item carousels, so tree building and
+walking cost about what they do on a live page. The output is
+deterministic. Real pages saved as search_*.html, item_*.html,
+desc_*.html or viewbids_*.html can be dropped in next to them and the
+benchmarks pick them up too.
+
+Usage (from the repo root):
+    python -m benchmarks.make_fixtures
+"""
+import json
+import os
+import random
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+WORDS = ('super smash bros melee nintendo gamecube 2001 tested complete case manual disc '
+         'authentic original great condition works fast shipping box black label player '
+         'choice new used like good acceptable scratch free rare collector').split()
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def sentence(rng, n):
+    return ' '.join(rng.choice(WORDS) for _ in range(n))
+
+
+def shell(rng, title, body, n_nav=150, n_script=20):
+    """Wraps body in the header, navigation, scripts and footer every
+    ebay page carries."""
+    nav = ''.join(f'<li class="gh-eb-li"><a class="gh-eb-li-a" href="https://www.ebay.com/b/{i}">'
+                  f'{sentence(rng, 2)}</a></li>' for i in range(n_nav))
+    scripts = ''.join('<script type="text/javascript">$vi_model = '
+                      + json.dumps({f'k{j}': sentence(rng, 6) for j in range(40)}) + ';</script>'
+                      for _ in range(n_script))
+    footer = ''.join(f'<li class="gf-li"><a class="thrd gf-bar-a" href="/help/{i}">{sentence(rng, 2)}</a></li>'
+                     for i in range(60))
+    return (f'<!DOCTYPE html><html lang="en"><head><meta charset="utf-8"><title>{title}</title>'
+            f'<link rel="stylesheet" href="https://ir.ebaystatic.com/rs/v/main.css">{scripts}</head>'
+            f'<body class="vi-contv2"><div id="gh" class="gh-w"><ul class="gh-eb">{nav}</ul></div>'
+            f'<div id="mainContent">{body}</div>'
+            f'<footer id="glbfooter"><ul class="gf-l">{footer}</ul></footer></body></html>')
+
+
+def carousel(rng, n):
+    """Recommended/sponsored item cards, the bulk of an item page."""
+    cards = ''.join(
+        f'<div class="s-item__wrapper clearfix"><div class="s-item__image-section">'
+        f'<div class="s-item__image"><a tabindex="-1" href="https://www.ebay.com/itm/{rng.randrange(10**11, 10**12)}">'
+        f'<div class="s-item__image-wrapper"><img class="s-item__image-img" alt="item" '
+        f'src="https://i.ebayimg.com/thumbs/images/g/{rng.randrange(10**6)}/s-l225.jpg"></div></a></div></div>'
+        f'<div class="s-item__info clearfix"><h3 class="s-item__title">{sentence(rng, 8)}</h3>'
+        f'<div class="s-item__details clearfix"><div class="s-item__detail s-item__detail--primary">'
+        f'<span class="s-item__price">${rng.randrange(10, 120)}.{rng.randrange(100):02d}</span></div>'
+        f'<div class="s-item__detail s-item__detail--primary"><span class="s-item__shipping">'
+        f'+${rng.randrange(3, 9)}.99 shipping</span></div></div></div></div>'
+        for _ in range(n))
+    return f'<div class="merch-module"><div class="carousel__container">{cards}</div></div>'
+
+
+def item_page(rng, item_id, n_images, n_cards):
+    thumbs = ''.join(
+        f'<td class="tdThumb" data-idx="{i}"><div><img src="https://i.ebayimg.com/images/g/'
+        f'{rng.randrange(10**8):08x}/s-l64.jpg" style="max-width:64px" alt="thumb {i}"></div></td>'
+        for i in range(n_images))
+    specifics = ''.join(f'<tr><td class="attrLabels">{sentence(rng, 2)}:</td><td width="50.0%">'
+                        f'<span>{sentence(rng, 3)}</span></td></tr>' for _ in range(12))
+    body = (
+        f'<div id="CenterPanel"><h1 class="it-ttl" itemprop="name">{sentence(rng, 10)}</h1>'
+        f'<div class="u-cb"><div class="nonActPanel"><span class="notranslate" id="prcIsum_bidPrice" '
+        f'itemprop="price">US ${rng.randrange(20, 90)}.{rng.randrange(100):02d}</span></div></div>'
+        f'<div class="u-flL condText" itemprop="itemCondition">{rng.choice(["Used", "Like New", "Very Good"])}</div>'
+        f'<table class="img img300" id="vi_main_img_fs"><tr>{thumbs}</tr></table>'
+        f'<span class="prodreview"><a href="#rwid">{rng.randrange(1, 400)} product ratings</a></span></div>'
+        f'<div id="RightSummaryPanel"><div class="mbg vi-VR-margBtm3"><span class="mbg-nw">seller{item_id % 97}</span>'
+        f'<span class="mbg-l"><a href="/usr/fdbk">({rng.randrange(10, 20000)}\n</a></span></div>'
+        f'<div id="si-fb">{rng.randrange(950, 1000) / 10}%&nbsp;Positive feedback</div></div>'
+        f'<div class="prodDetailSec"><table>{specifics}<tr><td class="attrLabels">Custom Bundle:</td>'
+        f'<td>{rng.choice(["No", "Yes"])}\n</td></tr></table></div>'
+        f'<div id="desc_wrapper_ctr"><iframe id="desc_ifr" title="Seller\'s description of item" '
+        f'src="https://vi.vipr.ebaydesc.com/ws/eBayISAPI.dll?ViewItemDescV4&amp;item={item_id}"></iframe></div>'
+        + carousel(rng, n_cards))
+    return shell(rng, f'Super Smash Bros Melee | eBay item {item_id}', body)
+
+
+def search_page(rng, n_results):
+    results = ''.join(
+        f'<li class="s-item s-item--watch-at-corner"><div class="s-item__wrapper clearfix">'
+        f'<div class="s-item__info clearfix"><a class="s-item__link" '
+        f'href="https://www.ebay.com/itm/Super-Smash-Bros-Melee/{rng.randrange(10**11, 10**12)}?hash=item{i:x}">'
+        f'<h3 class="s-item__title">{sentence(rng, 9)}</h3></a><div class="s-item__details clearfix">'
+        f'<span class="s-item__price">${rng.randrange(10, 90)}.{rng.randrange(100):02d}</span>'
+        f'<span class="s-item__bids s-item__bidCount">{rng.randrange(1, 40)} bids</span></div></div></div></li>'
+        for i in range(n_results))
+    body = (f'<div class="srp-controls"><h1 class="srp-controls__count-heading">'
+            f'<span class="BOLD">{rng.randrange(1000, 3000):,}</span> results for super smash bros melee</h1></div>'
+            f'<ul class="srp-results srp-list clearfix">{results}</ul>')
+    return shell(rng, 'super smash bros melee | eBay', body)
+
+
+def desc_page(rng, n_paragraphs):
+    text = ''.join(f'<p><font face="Arial">{sentence(rng, 25)}</font></p>' for _ in range(n_paragraphs))
+    return (f'<html><head><title>Description</title></head><body><div id="ds_div">'
+            f'<div class="ds_div_inner">{text}</div></div></body></html>')
+
+
+def bid_row(rng, price):
+    date = f'{rng.choice(MONTHS)} {rng.randrange(1, 29)}, 2020 at {rng.randrange(1, 13)}:{rng.randrange(60):02d}:' \
+           f'{rng.randrange(60):02d} {rng.choice(["AM", "PM"])} PDT'
+    user = f'{rng.choice("abcdefgh")}***{rng.choice("stuvwxyz")}'
+    return (f'<tr class="ui-component-table_tr_detailinfo"><td class="ui-component-table_td">'
+            f'<span>{user}</span><span class="app-bid-info-feedback"> ({rng.randrange(0, 3000)})</span></td>'
+            f'<td class="ui-component-table_td">${price:,.2f}</td>'
+            f'<td class="ui-component-table_td">{date}</td></tr>')
+
+
+def viewbids_page(rng, n_bids):
+    price = 20.0
+    rows = []
+    for i in range(n_bids):
+        price += rng.randrange(1, 200) / 100
+        row = bid_row(rng, price)
+        if i % 50 == 49:
+            row = row.replace('</tr>', '<td>Retracted</td></tr>')
+        rows.append(row)
+    rows.append('<tr class="ui-component-table_tr_detailinfo"><td class="ui-component-table_td">Starting Price</td>'
+                '<td class="ui-component-table_td">$20.00</td>'
+                '<td class="ui-component-table_td">Oct 1, 2020 at 9:00:00 AM PDT</td></tr>')
+    body = (f'<div class="app-bid-info_wrapper"><div>Bidders: {n_bids // 3}</div><div>Bids: {n_bids}</div>'
+            f'<div>Duration: 7 days</div></div><table class="ui-component-table">{"".join(reversed(rows))}</table>')
+    return shell(rng, 'Bid history | eBay', body, n_nav=60, n_script=5)
+
+
+def main():
+    rng = random.Random(2020)
+    os.makedirs(FIXTURES, exist_ok=True)
+    pages = {
+        'search_1.html': search_page(rng, 50),
+        'item_1.html': item_page(rng, 114230556674, n_images=6, n_cards=60),
+        'item_2.html': item_page(rng, 143595870217, n_images=12, n_cards=90),
+        'item_3.html': item_page(rng, 124401117734, n_images=3, n_cards=40),
+        'desc_1.html': desc_page(rng, 12),
+        'viewbids_1.html': viewbids_page(rng, 30),
+        'viewbids_2.html': viewbids_page(rng, 600),
+    }
+    for name, page in pages.items():
+        with open(os.path.join(FIXTURES, name), 'w') as f:
+            f.write(page)
+        print(f'{name}: {len(page) / 1024:.0f} KiB')
+    return None
+
+
+if __name__ == '__main__':
+    main()
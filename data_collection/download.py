@@ -0,0 +1,109 @@
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+from requests.exceptions import RequestException
+
+from data_collection.misc import read_yaml
+from data_collection.proxy_request import proxy_retrieve, session_retrieve
+
+folder = os.path.dirname(__file__)
+config_file = os.path.join(folder, '../conf.yaml')
+config = read_yaml(config_file)
+DOWNLOAD_WORKERS = config.get('download_workers', 8)
+DOWNLOADS_PER_HOST = config.get('downloads_per_host', 4)
+CACHE_REPLAY = config.get('cache_replay', False)
+
+
+class ImageDownloader:
+    """Download stage for item images. Item parsing only queues
+    (url, save_path) pairs with submit(); the transfers run on a
+    separate thread pool with at most per_host downloads open
+    against any one host at a time. Files already present at
+    save_path are skipped, and each image is streamed to a
+    temporary file that is only moved into place once complete,
+    so a crashed run never leaves a partial image that would be
+    skipped next time. In replay mode (cache_replay in conf.yaml)
+    nothing is fetched: images missing on disk are reported as failed.
+
+    Usage:
+        with ImageDownloader() as downloader:
+            downloader.submit(url, save_path, proxy)
+            ...
+        (exiting the block waits on all queued downloads)"""
+    def __init__(self, max_workers=DOWNLOAD_WORKERS, per_host=DOWNLOADS_PER_HOST, debug=False,
+                 replay=CACHE_REPLAY):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.per_host = per_host
+        self.debug = debug
+        self.replay = replay
+        self.futures = []
+        self.failed = []
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._lock = threading.Lock()
+
+    def _slot(self, url, proxy):
+        host = 'proxy' if proxy else urlparse(url).netloc
+        with self._lock:
+            return self._host_slots[host]
+
+    def _download(self, url, save_path, proxy):
+        if os.path.exists(save_path):
+            return None
+        if self.replay:
+            with self._lock:
+                self.failed.append((url, save_path))
+            return None
+        tmp_path = save_path + '.part'
+        try:
+            with self._slot(url, proxy):
+                if proxy:
+                    proxy_retrieve(url, tmp_path)
+                else:
+                    session_retrieve(url, tmp_path)
+            if os.path.exists(tmp_path):
+                os.replace(tmp_path, save_path)
+        except (RequestException, OSError) as e:
+            print(e) if self.debug else False
+            print(f'Failed to get image {url}') if self.debug else False
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self.failed.append((url, save_path))
+        return None
+
+    def submit(self, url, save_path, proxy=False):
+        """Queues a single image download.
+        Args:
+            url: str of the image
+            save_path: str of image write address
+            proxy: bool to control proxy usage.
+        Returns:
+            None"""
+        future = self.executor.submit(self._download, url, save_path, proxy)
+        with self._lock:
+            self.futures.append(future)
+        return None
+
+    def join(self):
+        """Waits on every queued download.
+        Returns:
+            [(str, str), ...] of (url, save_path) that failed."""
+        with self._lock:
+            futures, self.futures = self.futures, []
+        wait(futures)
+        return self.failed
+
+    def close(self):
+        self.join()
+        self.executor.shutdown()
+        return None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
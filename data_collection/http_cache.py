@@ -0,0 +1,177 @@
+import atexit
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from data_collection.misc import read_yaml
+
+folder = os.path.dirname(__file__)
+config_file = os.path.join(folder, '../conf.yaml')
+config = read_yaml(config_file)
+
+# Time-to-live in seconds per class of url, first match wins. None
+# never expires: bid histories and descriptions of a sold (ended)
+# listing don't change, while search results change constantly.
+TTLS = (
+    (re.compile(r'ebay\.com/sch/'), 60 * 60),
+    (re.compile(r'ebay\.com/bfl/viewbids/'), None),
+    (re.compile(r'ebaydesc\.com'), None),
+    (re.compile(r'ebay\.com/itm/'), 30 * 24 * 60 * 60),
+)
+DEFAULT_TTL = 24 * 60 * 60
+# Cache hits whose accessed_at is written in one transaction, instead
+# of one commit (and fsync) per page read.
+ACCESS_FLUSH_SIZE = 500
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def url_ttl(url: str):
+    """Time-to-live in seconds for url (None for no expiry)."""
+    for pattern, ttl in TTLS:
+        if pattern.search(url):
+            return ttl
+    return DEFAULT_TTL
+
+
+class ResponseCache:
+    """Persistent on-disk cache of page bodies keyed by url, backed
+    by SQLite. Bodies are zlib compressed and stored once per
+    content hash, so urls serving identical pages share storage.
+    Entries expire per url class (see TTLS), and once the stored
+    bodies exceed max_bytes the least recently used urls are
+    evicted. Safe to share between threads. In replay mode TTLs are
+    ignored, so a recorded run can be replayed from the cache alone.
+    Access times of hits are buffered and written in batches; call
+    close() to write the rest.
+    Args:
+        path: str of the directory holding the cache database
+        max_bytes: int bound on the compressed size of all bodies
+        replay: bool to serve every stored page regardless of age"""
+    def __init__(self, path, max_bytes, replay=False):
+        os.makedirs(path, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.replay = replay
+        self._lock = threading.Lock()
+        self._accessed = {}
+        self._conn = sqlite3.connect(os.path.join(path, 'responses.sqlite'), check_same_thread=False)
+        with self._conn:
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS bodies (
+                hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL
+                );""")
+            self._conn.execute("""CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                hash TEXT NOT NULL REFERENCES bodies(hash),
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+                );""")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS pages_accessed ON pages (accessed_at);")
+        self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM bodies;").fetchone()[0]
+
+    def get(self, url: str):
+        """Cached page for url, or None if missing or expired (entries
+        never expire in replay mode).
+        Args:
+            url: str
+        Returns:
+            str or None"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                """SELECT bodies.body, pages.fetched_at FROM pages
+                JOIN bodies ON bodies.hash = pages.hash WHERE pages.url = ?;""", (url, )
+            ).fetchone()
+            if row is None:
+                return None
+            body, fetched_at = row
+            ttl = url_ttl(url)
+            if not self.replay and ttl is not None and now - fetched_at > ttl:
+                return None
+            self._accessed[url] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+        return zlib.decompress(body).decode('utf-8')
+
+    def set(self, url: str, page: str):
+        """Stores page as the response for url.
+        Args:
+            url: str
+            page: str
+        Returns:
+            None"""
+        raw = page.encode('utf-8')
+        digest = hashlib.sha1(raw).hexdigest()
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                exists = self._conn.execute("SELECT 1 FROM bodies WHERE hash = ?;", (digest, )).fetchone()
+                if exists is None:
+                    body = zlib.compress(raw)
+                    self._conn.execute("INSERT INTO bodies (hash, body, size) VALUES (?, ?, ?);",
+                                       (digest, body, len(body)))
+                    self._size += len(body)
+                self._conn.execute("INSERT OR REPLACE INTO pages (url, hash, fetched_at, accessed_at) "
+                                   "VALUES (?, ?, ?, ?);", (url, digest, now, now))
+            self._accessed.pop(url, None)
+            if self._size > self.max_bytes:
+                self._evict()
+        return None
+
+    def _evict(self):
+        """Drops least recently used urls until the stored bodies fit
+        within 90% of max_bytes, leaving headroom so eviction doesn't
+        run on every insert. Caller holds self._lock."""
+        self._flush_accessed()
+        target = 0.9 * self.max_bytes
+        with self._conn:
+            while self._size > target:
+                urls = self._conn.execute(
+                    "SELECT url FROM pages ORDER BY accessed_at LIMIT 100;").fetchall()
+                if not urls:
+                    break
+                self._conn.executemany("DELETE FROM pages WHERE url = ?;", urls)
+                self._conn.execute("DELETE FROM bodies WHERE hash NOT IN (SELECT hash FROM pages);")
+                self._size = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM bodies;").fetchone()[0]
+        return None
+
+    def _flush_accessed(self):
+        """Writes the buffered access times of hits in one
+        transaction. Caller holds self._lock."""
+        if self._accessed:
+            with self._conn:
+                self._conn.executemany("UPDATE pages SET accessed_at = ? WHERE url = ?;",
+                                       [(t, url) for url, t in self._accessed.items()])
+            self._accessed.clear()
+        return None
+
+    def close(self):
+        """Writes the buffered access times and closes the database."""
+        with self._lock:
+            self._flush_accessed()
+            self._conn.close()
+        return None
+
+
+def get_cache():
+    """Process-wide ResponseCache built from conf.yaml on first call,
+    or None when response_cache is off. cache_replay turns the cache on
+    in replay mode (see ResponseCache and request.get_page). The cache
+    is closed at interpreter exit.
+    Returns:
+        ResponseCache or None"""
+    global _cache
+    replay = config.get('cache_replay', False)
+    if not (config.get('response_cache', False) or replay):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(config['cache_path'], config.get('cache_max_mb', 2048) * 1024 ** 2, replay)
+            atexit.register(_cache.close)
+    return _cache
@@ -1,8 +1,12 @@
 import datetime
 import os
+from itertools import islice
+
+import pandas as pd
 
 from data_collection.misc import read_yaml
-from data_collection import req_to_db as rdb, request as req
+from data_collection import pipeline as pl, req_to_db as rdb, request as req
+from data_collection.download import ImageDownloader
 
 folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '..', 'conf.yaml')
@@ -11,17 +15,80 @@ secrets = read_yaml(os.path.join(folder, '..', config['secrets']))
 logs = config['logging_path']
 
 proxy = True
-batch_size = 5
+pipeline = False
+# Items of a batch are scraped concurrently, so a batch smaller than
+# max_workers in conf.yaml leaves part of the thread pool idle.
+batch_size = 10
 if not os.path.exists(logs):
     os.mkdir(logs)
 
 
+def scrape_batch(batch, writer, downloader=None):
+    """Scrapes a batch of listing ids and queues the results on writer.
+    Args:
+        batch: [int, ..., int] of listing ids
+        writer: req_to_db.BatchWriter
+        downloader: ImageDownloader to queue item images on
+    Returns:
+        None"""
+    try:
+        print('Initializing items...')
+        items = req.listings_to_items(batch, proxy)
+        print('Getting data on items...')
+        dfs = req.collect_items(items, bid_done=True, downloader=downloader, size='full')
+        writer.add(dfs)
+    except Exception as e:
+        print('Failure on parse.')
+        print(e)
+    return None
+
+
+def iter_new_listings(query, options, throttle=0):
+    """Generator over the listing ids for a query that are not in the
+    DB yet. Search result pages are streamed in, so ids are yielded
+    as soon as their page arrives.
+    Args:
+        query: str to pass into Ebay for search.
+        options: ListingOptions
+        throttle: int, if >0 stops after that many ids.
+    Yields:
+        int"""
+    seen = set()
+    online, found = 0, 0
+    for page in req.iter_listing_pages(query, options, proxy):
+        online += len(page)
+        page = [listing for listing in page if listing not in seen]
+        seen.update(page)
+        for listing in rdb.remove_existing_items(page, 'main'):
+            if throttle and found >= throttle:
+                print(f'Throttling to {found} items.')
+                return
+            found += 1
+            yield listing
+    print(f'Found {found} new entries for database out of {online} online.')
+
+
+def batched(iterable, n):
+    """Splits an iterable into lists of n (the last may be shorter)."""
+    iterator = iter(iterable)
+    batch = list(islice(iterator, n))
+    while batch:
+        yield batch
+        batch = list(islice(iterator, n))
+
+
 def main(throttle=0):
     """Main method for data_collection folder. Sets up listing
     options and query, gets response from Ebay (can use proxy
     to safeguard against getting blacklisted), scrapes responses
     into Item objects then writes the data into postgres DB. The
-    writing process is done in batches (5 or 10 is a good idea).
+    writing process is done in batches (5 or 10 is a good idea),
+    and several batches are committed together in one transaction
+    (see req_to_db.BatchWriter).
+    Search result pages are streamed in, so scraping starts as
+    soon as a full batch of new listings has been found. With
+    pipeline = True, parsing runs on a process pool (see
+    data_collection.pipeline).
     Args:
         throttle: int
             if 0, nothing happens. if >0, only gathers that many
@@ -32,50 +99,29 @@ def main(throttle=0):
     options.listing_types = 'auction'
     options.show_only = 'sold'
 
-    listings = req.get_listings('Super Smash Bros Melee', options, proxy)
-    listings_needed = rdb.remove_existing_items(listings, 'main')
-    print(f'Found {len(listings_needed)} new entries for database out of {len(listings)} online.')
-    if throttle:
-        listings_needed = listings_needed[:throttle]
-        print(f'Throttling to {len(listings_needed)} items.')
-
-    df1_fails = []
-    df2_fails = []
-    df3_fails = []
-
-    for i in range(len(listings_needed)//batch_size + 1):
-        try:
-            batch = listings_needed[i*batch_size: (i+1)*batch_size]
-            print('Initializing items...')
-            items = req.listings_to_items(batch, proxy)
-            print('Getting data on items...')
-            df1 = req.df_data_on_listings(items, bid_done=True, size='full')
-            df2 = req.df_image_addresses(items)
-            df3 = req.df_bid_histories(items)
-
-            print('Writing to database...')
-            try:
-                rdb.write(df1, 'main')
-            except:
-                df1_fails.append(df1)
-            try:
-                rdb.write(df2, 'imgs')
-            except:
-                df2_fails.append(df2)
-            try:
-                rdb.write(df3, 'bids')
-            except:
-                df3_fails.append(df3)
-        except Exception as e:
-            print('Failure on parse.')
-            print(e)
+    # Images download in the background while later batches are scraped.
+    with ImageDownloader() as downloader, rdb.BatchWriter() as writer:
+        listings = iter_new_listings('Super Smash Bros Melee', options, throttle)
+        if pipeline:
+            for dfs in pl.run_pipeline(listings, proxy, downloader, batch_size):
+                writer.add(dfs)
+        else:
+            for batch in batched(listings, batch_size):
+                scrape_batch(batch, writer, downloader)
+        print('Waiting on image downloads...')
 
     # Logging section
-    df_fails = [df1_fails, df2_fails, df3_fails]
-    label = ['main', 'imgs', 'bids']
-    for i, label in enumerate(label):
-        for df in df_fails[i]:
-            df.to_csv(f'{logs}{label}_{datetime.datetime.now().strftime("%Y%m%d_%H%M%S")}')
+    stamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+    for i, frames in enumerate(writer.failed):
+        for label, df in frames.items():
+            df.to_csv(f'{logs}{label}_{stamp}_{i}')
+
+    # Image rows are written before their downloads finish, so drop the
+    # rows of failed downloads instead of pointing at missing files.
+    if downloader.failed:
+        pd.DataFrame(downloader.failed, columns=['url', 'save_path']).to_csv(f'{logs}img_downloads_{stamp}')
+        removed = rdb.remove_images([save_path for _, save_path in downloader.failed])
+        print(f'{len(downloader.failed)} image downloads failed; removed {removed} rows from imgs.')
     return None
 
 
@@ -0,0 +1,117 @@
+import os
+from itertools import chain
+
+import lxml.html
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from data_collection.misc import read_yaml
+
+folder = os.path.dirname(__file__)
+config_file = os.path.join(folder, '../conf.yaml')
+config = read_yaml(config_file)
+PARSER_BACKEND = config.get('parser_backend', 'bs4')
+BACKENDS = ('bs4', 'lxml')
+
+# Every class and id read off an item page by the Item.get_* methods.
+ITEM_PAGE_CLASSES = ('notranslate', 'condText', 'prodDetailSec', 'mbg-l', 'prodreview', 'tdThumb')
+ITEM_PAGE_IDS = ('desc_ifr', 'si-fb')
+
+# The helpers below accept a tree/node from either backend: a bs4 Tag
+# (BeautifulSoup is one) or an lxml.html element. Scraping code should
+# only touch parsed pages through them, so the backend stays swappable.
+
+
+def parse_html(page: str, backend=PARSER_BACKEND):
+    """Parses an html page with the chosen backend. 'bs4' builds a
+    full BeautifulSoup tree (the original behaviour, and the most
+    forgiving); 'lxml' builds a raw lxml.html tree, which is several
+    times faster to build and query on large item pages.
+    Args:
+        page: str of html
+        backend: str, one of BACKENDS. Defaults to conf.yaml's
+            parser_backend.
+    Returns:
+        BeautifulSoup or lxml.html.HtmlElement"""
+    if backend not in BACKENDS:
+        print(f'Parser backend {backend} not recognized; defaulting to bs4.')
+        backend = 'bs4'
+    if backend == 'lxml':
+        if not page.strip():
+            page = '<html></html>'
+        return lxml.html.document_fromstring(page)
+    return BeautifulSoup(page, 'lxml')
+
+
+def find_all_class(tree, cls: str) -> list:
+    """All nodes having html class cls, in document order."""
+    if isinstance(tree, Tag):
+        return tree.find_all(class_=cls)
+    return tree.find_class(cls)
+
+
+def find_id(tree, node_id: str):
+    """The node with html id node_id, or None."""
+    if isinstance(tree, Tag):
+        return tree.find(id=node_id)
+    return tree.get_element_by_id(node_id, None)
+
+
+def node_attr(node, name: str):
+    """Attribute name of node, or None if it isn't set."""
+    return node.get(name)
+
+
+def node_html(node) -> str:
+    """The html of node, serialized back to a str."""
+    if isinstance(node, Tag):
+        return str(node)
+    return lxml.html.tostring(node, encoding='unicode', with_tail=False)
+
+
+def node_text(node) -> str:
+    """All of the text data within a node, concatenated. Equivalent
+    to feeding node_html(node) through an HTMLParser, without
+    serializing and re-parsing the html.
+    Args:
+        node: bs4 Tag, lxml element or None
+    Returns:
+        str"""
+    if node is None:
+        return ''
+    if isinstance(node, Tag):
+        return node.get_text()
+    return str(node.text_content())
+
+
+def _iter_tags(tree):
+    """Every element of the tree, as (node, [class, ...], id)."""
+    if isinstance(tree, Tag):
+        for tag in tree.find_all(True):
+            yield tag, tag.get('class', ()), tag.get('id')
+    else:
+        for el in tree.iter():
+            if isinstance(el.tag, str):  # Skips comments and processing instructions.
+                yield el, el.get('class', '').split(), el.get('id')
+
+
+def extract_nodes(tree, classes=ITEM_PAGE_CLASSES, ids=ITEM_PAGE_IDS) -> dict:
+    """Collects every node matching any of the given classes or ids
+    in a single walk over the page, instead of one full-tree
+    find_all per field.
+    Args:
+        tree: parsed page from parse_html
+        classes: (str, ..., str) of html classes to collect
+        ids: (str, ..., str) of html ids to collect
+    Returns:
+        dict mapping each class/id to a list of its nodes, in
+        document order (so [0] matches find_all_class(...)[0])."""
+    nodes = {key: [] for key in chain(classes, ids)}
+    classes, ids = set(classes), set(ids)
+    for node, node_classes, node_id in _iter_tags(tree):
+        for cls in node_classes:
+            if cls in classes:
+                nodes[cls].append(node)
+        if node_id in ids:
+            nodes[node_id].append(node)
+    return nodes
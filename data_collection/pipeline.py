@@ -0,0 +1,144 @@
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from data_collection.misc import read_yaml
+from data_collection.parsing import parse_html
+from data_collection.request import (BID_COLUMNS, IMG_COLUMNS, MAIN_COLUMNS, MAX_WORKERS, Item, get_page,
+                                     nan_to_none)
+
+folder = os.path.dirname(__file__)
+config_file = os.path.join(folder, '../conf.yaml')
+config = read_yaml(config_file)
+PARSE_WORKERS = config.get('parse_workers', os.cpu_count())
+# Parse workers start lazily, on the first submit from an I/O thread,
+# while other threads may hold locks (urllib3, stdout, the sqlite cache)
+# and the process has open postgres, sqlite and http sockets. Forking
+# then would copy all of that into the children, so they are started
+# from a clean forkserver process instead.
+PARSE_CONTEXT = multiprocessing.get_context('forkserver')
+
+# Pipeline mode splits item scraping into three stages:
+#   1. I/O threads fetch the raw html of each item's pages,
+#   2. a process pool parses the html into plain tuples, one core each,
+#   3. the caller writes the tuples to postgres in batches.
+# Only html strings and small records cross the process boundary;
+# parsed trees never leave the worker that built them.
+
+
+def parse_item_pages(item_id: int, item_html: str, bid_html: str, size='full') -> tuple:
+    """Parse stage for the item and viewbids pages. Runs in a worker process.
+    Args:
+        item_id: int
+        item_html: str of the item page
+        bid_html: str of the viewbids page
+        size: str passed to Item.get_images
+    Returns:
+        (tuple, str, ((str, str), ...), [tuple, ...]) of the item data
+        (see Item.get_item_data, with no text yet), the description
+        page url, the (url, save_path) image pairs and the bid rows."""
+    item = Item(item_id)
+    item.soup = parse_html(item_html)
+    item.bid_soup = parse_html(bid_html)
+    record = item.get_item_data(main_text=False, size=size)
+    bids = item.get_bidding_history()
+    return record, item.get_desc_url(), item.image_sources, list(bids.itertuples(index=False, name=None))
+
+
+def parse_description(item_id: int, desc_html: str) -> str:
+    """Parse stage for the seller description page. Runs in a worker process."""
+    return Item(item_id).get_main_text(desc_soup=parse_html(desc_html))
+
+
+def fetch_and_parse(item_id: int, proxy: bool, parse_pool, size='full') -> tuple:
+    """Fetches the pages of one item and hands them to parse_pool.
+    Runs on an I/O thread.
+    Args:
+        item_id: int
+        proxy: bool to control proxy usage.
+        parse_pool: ProcessPoolExecutor
+        size: str passed to Item.get_images
+    Returns:
+        (tuple, ((str, str), ...), [tuple, ...]) of the item data,
+        the (url, save_path) image pairs and the bid rows."""
+    item = Item(item_id, proxy=proxy)
+    item.update_init(bid_done=True)
+    item_html = get_page(item.url, proxy)
+    bid_html = get_page(item.get_bid_url(), proxy)
+    record, desc_url, image_sources, bid_rows = parse_pool.submit(
+        parse_item_pages, item_id, item_html, bid_html, size).result()
+    text = 'N/A'
+    if desc_url is not None:
+        text = parse_pool.submit(parse_description, item_id, get_page(desc_url, proxy)).result()
+    record = record[:4] + (text, ) + record[5:]
+    return record, image_sources, bid_rows
+
+
+@nan_to_none
+def df_from_rows(rows: list, columns: list) -> pd.DataFrame:
+    df = pd.DataFrame(rows, columns=columns).reset_index(drop=True)
+    df.index.rename('idx', inplace=True)
+    return df
+
+
+def run_pipeline(listings, proxy=False, downloader=None, batch_size=10, size='full',
+                 max_workers=MAX_WORKERS, parse_workers=PARSE_WORKERS):
+    """Pipelined counterpart to request.collect_items for a stream of
+    listing ids. Pages are fetched on max_workers threads and parsed
+    on parse_workers processes, so parsing scales with core count.
+    Yields the dataframes for the 'main', 'imgs' and 'bids' tables
+    every batch_size finished items. Items finish out of order.
+    Args:
+        listings: iterable of int listing ids (may be a generator)
+        proxy: bool to control proxy usage.
+        downloader: ImageDownloader to queue item images on, or None
+        batch_size: int of items per yielded batch
+        size: str passed to Item.get_images
+        max_workers: int for the number of items fetched at once
+        parse_workers: int for the number of parse processes
+    Yields:
+        (pd.DataFrame,) * 3"""
+    records, img_rows, bid_rows = [], [], []
+
+    def collect(done):
+        for future in done:
+            try:
+                record, image_sources, bids = future.result()
+            except Exception as e:
+                print('Failure on parse.')
+                print(e)
+                continue
+            records.append(record)
+            for image_url, save_path in image_sources:
+                img_rows.append((record[0], save_path))
+                if downloader is not None:
+                    downloader.submit(image_url, save_path, proxy)
+            bid_rows.extend(bids)
+
+    def take_batch():
+        batch = (df_from_rows(records, MAIN_COLUMNS), df_from_rows(img_rows, IMG_COLUMNS),
+                 df_from_rows(bid_rows, BID_COLUMNS))
+        records.clear()
+        img_rows.clear()
+        bid_rows.clear()
+        return batch
+
+    with ProcessPoolExecutor(max_workers=parse_workers, mp_context=PARSE_CONTEXT) as parse_pool, \
+            ThreadPoolExecutor(max_workers=max_workers) as io_pool:
+        pending = set()
+        for item_id in listings:
+            pending.add(io_pool.submit(fetch_and_parse, item_id, proxy, parse_pool, size))
+            if len(pending) >= 2 * max_workers:  # Bound the work queued ahead of the writer.
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(done)
+            if len(records) >= batch_size:
+                yield take_batch()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            collect(done)
+            if len(records) >= batch_size:
+                yield take_batch()
+    if records:
+        yield take_batch()
@@ -1,6 +1,8 @@
 import os
 import requests
-import shutil
+import threading
+
+from requests.adapters import HTTPAdapter
 
 from data_collection.misc import read_yaml
 
@@ -8,6 +10,80 @@ folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '../conf.yaml')
 config = read_yaml(config_file)
 secrets = read_yaml(os.path.join(folder, '..', config['secrets']))
+CHUNK_SIZE = 64 * 1024
+# Item threads, listing page threads and image downloads can all hold a
+# connection to the same (proxy) host at once.
+POOL_MAXSIZE = config.get('pool_maxsize',
+                          2 * config.get('max_workers', 1) + config.get('download_workers', 8))
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session(pool_connections=config.get('pool_connections', 4),
+                pool_maxsize=POOL_MAXSIZE) -> requests.Session:
+    """Shared requests.Session used by every fetch path. Connections
+    are kept alive and pooled per host, so repeated requests to the
+    Zenscrape endpoint or to Ebay reuse an open TCP+TLS connection.
+    The session is built once on first call; the pool sizes are
+    read from conf.yaml.
+    Args:
+        pool_connections: int for the number of per-host pools kept.
+        pool_maxsize: int for the connections kept open per host.
+            Should be at least 2 * max_workers + download_workers,
+            the item and listing page threads plus the image downloads
+            that can share a host, or urllib3 discards the extra
+            connections ("Connection pool is full") and keep-alive is
+            lost under load.
+    Returns:
+        requests.Session"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_connections,
+                                  pool_maxsize=pool_maxsize)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _session = session
+    return _session
+
+
+def stream_to_file(response, filename, chunk_size=CHUNK_SIZE):
+    """Writes the body of a streamed response to filename in chunks,
+    so a full image is never held in memory.
+    Args:
+        response: requests.Response made with stream=True
+        filename: str of write address
+        chunk_size: int of bytes per write
+    Returns:
+        None"""
+    with open(filename, 'wb') as f:
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            f.write(chunk)
+    return None
+
+
+def session_get(url, **kwargs):
+    """Method for non-proxy url gets through the shared session.
+    Args:
+        url: str
+    Returns:
+        html response"""
+    return get_session().get(url, **kwargs)
+
+
+def session_retrieve(url, filename):
+    """Method for non-proxy image downloads through the shared session.
+    Args:
+        url: str
+        filename: str of image write address
+    Returns:
+        None"""
+    with session_get(url, stream=True) as r:
+        r.raise_for_status()
+        stream_to_file(r, filename)
+    return None
 
 
 def proxy_get(url):
@@ -23,8 +99,8 @@ def proxy_get(url):
         ("url", url),
         ("location", "na")
     )
-    response = requests.get('https://app.zenscrape.com/api/v1/get',
-                            headers=headers, params=params)
+    response = get_session().get('https://app.zenscrape.com/api/v1/get',
+                                 headers=headers, params=params)
     return response
 
 
@@ -34,7 +110,9 @@ def proxy_retrieve(url, filename):
         url: str
         filename: str of image write address
     Returns:
-        None"""
+        None
+    Raises:
+        requests.HTTPError if the image couldn't be retrieved."""
     headers = {
         "apikey": secrets['zenscrape_api_key']
     }
@@ -43,14 +121,9 @@ def proxy_retrieve(url, filename):
         ("location", "na")
     )
     # Open the url image, set stream to True, this will return the stream content.
-    r = requests.get('https://app.zenscrape.com/api/v1/get',
-                     stream=True, headers=headers, params=params)
-
-    # Check if the image was retrieved successfully
-    if r.status_code == 200:
-        r.raw.decode_content = True
-        with open(filename, 'wb') as f:
-            shutil.copyfileobj(r.raw, f)
-    else:
-        print('Image couldn\'t be retrieved: ', filename)
-    return None
\ No newline at end of file
+    with get_session().get('https://app.zenscrape.com/api/v1/get',
+                           stream=True, headers=headers, params=params) as r:
+        # Raise if the image wasn't retrieved, so the caller can record the failure.
+        r.raise_for_status()
+        stream_to_file(r, filename)
+    return None
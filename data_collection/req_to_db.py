@@ -1,6 +1,13 @@
+import datetime
+import io
 import psycopg2
 import psycopg2.extras
+import psycopg2.pool
 import os
+import threading
+import time
+
+import pandas as pd
 
 from functools import wraps
 
@@ -12,6 +19,24 @@ config_file = os.path.join(folder, '../conf.yaml')
 config = read_yaml(config_file)
 secrets = read_yaml(os.path.join(folder, '..', config['secrets']))
 
+BIDS_PARTITIONED = config.get('bids_partitioned', False)
+BIDS_PARTITION_START = config.get('bids_partition_start', 2019)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def psql_dsn(config, secrets):
+    """Postgres connection string.
+    Args:
+        config: dict from read_yaml output.
+        secrets: dict from secrets.yaml.
+    Returns:
+        str"""
+    return "dbname={} user={} password={} host={} port={}".format(
+        config['dbname'], config['user'], secrets['passwd'], config['host'], config['port']
+    )
+
 
 def psql_connect(config, secrets):
     """Postgres connection object.
@@ -20,11 +45,47 @@ def psql_connect(config, secrets):
         secrets: dict from secrets.yaml.
     Returns:
         psycopg2.connect"""
-    return psycopg2.connect(
-        "dbname={} user={} password={} host={} port={}".format(
-            config['dbname'], config['user'], secrets['passwd'], config['host'], config['port']
-        )
-    )
+    return psycopg2.connect(psql_dsn(config, secrets))
+
+
+class BlockingConnectionPool(psycopg2.pool.ThreadedConnectionPool):
+    """ThreadedConnectionPool whose getconn() waits for a connection to
+    be returned once maxconn are in use, where the parent class raises
+    PoolError. Connections must be handed back with putconn()."""
+    def __init__(self, minconn, maxconn, *args, **kwargs):
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, *args, **kwargs)
+
+    def getconn(self, key=None):
+        self._slots.acquire()
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+
+def get_pool(minconn=config.get('db_pool_min', 1), maxconn=config.get('db_pool_max', 10)):
+    """Process-wide pool of Postgres connections, built on first call.
+    Thread safe, so concurrent collectors can share it. With more
+    threads than maxconn writing at once, the extra ones wait for a
+    free connection.
+    Args:
+        minconn: int of connections opened up front.
+        maxconn: int of connections open at most.
+    Returns:
+        BlockingConnectionPool"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BlockingConnectionPool(minconn, maxconn, psql_dsn(config, secrets))
+    return _pool
 
 
 def get_cursor(f):
@@ -43,16 +104,24 @@ def get_cursor(f):
         you can simply do:
         @get_cursor
         def f(cur, *args, **kwargs):
-            do things with cur..."""
+            do things with cur...
+        Connections are borrowed from get_pool() and returned
+        once f is done, so each call runs in its own transaction
+        without paying for a new connection."""
     @wraps(f)
     def _return_f(*args, **kwargs):
-        with psql_connect(config, secrets) as conn:
-            with conn.cursor() as cur:
-                try:
-                    return f(*args, cur=cur, **kwargs)
-                except Exception as e:
-                    conn.rollback()
-                    raise psycopg2.ProgrammingError
+        pool = get_pool()
+        conn = pool.getconn()
+        try:
+            with conn:
+                with conn.cursor() as cur:
+                    try:
+                        return f(*args, cur=cur, **kwargs)
+                    except Exception as e:
+                        conn.rollback()
+                        raise psycopg2.ProgrammingError
+        finally:
+            pool.putconn(conn, close=bool(conn.closed))
     return _return_f
 
 
@@ -88,11 +157,14 @@ def mk_img_tbl(cur=None, table='imgs', foreign_table='main'):
         """.format(table, foreign_table))
 
 
-@get_cursor
-def mk_bid_tbl(cur=None, table='bids', foreign_table='main'):
-    """Makes postgres table 'bids'."""
+# Covering indexes for the per-item lookups and joins back to main.
+BID_INDEX = "CREATE INDEX IF NOT EXISTS {0}_id_datetime_idx ON {0} (id, datetime) INCLUDE (user_id, score, bid);"
+IMG_INDEX = "CREATE INDEX IF NOT EXISTS {0}_id_idx ON {0} (id) INCLUDE (url);"
+
+
+def _mk_bid_tbl(cur, table, foreign_table, partitioned):
     cur.execute("""CREATE TABLE IF NOT EXISTS {} (
-        idx SERIAL PRIMARY KEY,
+        idx SERIAL{},
         id BIGINT NOT NULL,
         user_id CHAR(5) NOT NULL,
         score INT,
@@ -101,61 +173,333 @@ def mk_bid_tbl(cur=None, table='bids', foreign_table='main'):
         CONSTRAINT fk_id
             FOREIGN KEY(id)
                 REFERENCES {}(id)
-        );
-        """.format(table, foreign_table))
+        ){};
+        """.format(table, '' if partitioned else ' PRIMARY KEY', foreign_table,
+                   ' PARTITION BY RANGE (datetime)' if partitioned else ''))
+    if partitioned:
+        mk_bid_partitions(cur, table)
+
+
+def mk_bid_partitions(cur, table='bids', start_year=BIDS_PARTITION_START):
+    """Makes yearly partitions of a partitioned bids table, from
+    start_year through next year, plus a default partition for null
+    or out of range datetimes. Safe to rerun; run it yearly so the
+    next year's partition exists before its bids arrive (a range
+    can't be split off the default partition once it holds rows)."""
+    cur.execute(f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT;")
+    for year in range(start_year, datetime.date.today().year + 2):
+        cur.execute(f"""CREATE TABLE IF NOT EXISTS {table}_y{year} PARTITION OF {table}
+            FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01');""")
+
+
+def _relkind(cur, table):
+    """pg_class.relkind of table ('r' plain, 'p' partitioned), or None
+    if it doesn't exist."""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (table, ))
+    row = cur.fetchone()
+    return None if row is None else row[0]
+
+
+@get_cursor
+def mk_bid_tbl(cur=None, table='bids', foreign_table='main', partitioned=BIDS_PARTITIONED):
+    """Makes postgres table 'bids'. With partitioned=True the table
+    is range partitioned by year on datetime, which keeps per-item
+    and time range queries fast as bid history grows. Partitioned
+    tables have no primary key, since it would need to include the
+    nullable datetime column. An existing unpartitioned table is left
+    as is; migrate it with partition_bids()."""
+    if partitioned and _relkind(cur, table) == 'r':
+        print(f'{table} exists and is not partitioned; run partition_bids() to migrate it.')
+        return None
+    _mk_bid_tbl(cur, table, foreign_table, partitioned)
+
+
+@get_cursor
+def partition_bids(cur=None, table='bids', foreign_table='main'):
+    """One-off migration of an existing, unpartitioned bids table to
+    a partitioned one (see mk_bid_tbl). Rows, including their idx,
+    are copied over in a single transaction."""
+    if _relkind(cur, table) == 'p':
+        print(f'{table} is already partitioned.')
+        return None
+    old = f'{table}_unpartitioned'
+    cur.execute(f"ALTER TABLE {table} RENAME TO {old};")
+    cur.execute(f"ALTER INDEX IF EXISTS {table}_id_datetime_idx RENAME TO {old}_id_datetime_idx;")
+    _mk_bid_tbl(cur, table, foreign_table, partitioned=True)
+    cur.execute(f"INSERT INTO {table} SELECT * FROM {old};")
+    cur.execute(f"""SELECT setval(pg_get_serial_sequence('{table}', 'idx'),
+        (SELECT COALESCE(MAX(idx), 0) + 1 FROM {old}), false);""")
+    cur.execute(f"DROP TABLE {old};")
+    cur.execute(BID_INDEX.format(table))
+    return None
+
+
+# Schema migrations, applied in order and recorded by name in
+# schema_migrations. Only ever append to this.
+MIGRATIONS = (
+    ('bids_id_datetime_idx', BID_INDEX.format('bids')),
+    ('imgs_id_idx', IMG_INDEX.format('imgs')),
+)
+
+
+@get_cursor
+def migrate(cur=None, migrations=MIGRATIONS):
+    """Applies any schema migrations not yet recorded in the DB."""
+    cur.execute("""CREATE TABLE IF NOT EXISTS schema_migrations (
+        name TEXT PRIMARY KEY,
+        applied_at timestamp NOT NULL DEFAULT now()
+        );""")
+    cur.execute("SELECT name FROM schema_migrations;")
+    applied = {row[0] for row in cur.fetchall()}
+    for name, statement in migrations:
+        if name not in applied:
+            print(f'Applying migration {name}.')
+            cur.execute(statement)
+            cur.execute("INSERT INTO schema_migrations (name) VALUES (%s);", (name, ))
+    return None
 
 
 def mk_tables():
     mk_main_tbl()
     mk_img_tbl()
     mk_bid_tbl()
+    migrate()
     return None
 
 
 @get_cursor
-def _drop_tbls(cur=None, tables=('imgs', 'bids', 'main')):
+def _drop_tbls(cur=None, tables=('imgs', 'bids', 'main', 'schema_migrations')):
     """DEV tool only. Drop tables."""
     for table in tables:
         cur.execute(f"DROP TABLE IF EXISTS {table};")
 
 
+def _insert_rows(cur, df, table):
+    """Per-row INSERT path for write(), via execute_batch. Any
+    duplicate aborts the batch, so every id of df is written.
+    Returns:
+        set of the ids written, if df has an id column"""
+    df_columns = list(df)
+    # create (col1,col2,...)
+    columns = ",".join(df_columns)
+    # create VALUES('%s', '%s",...) one '%s' per column
+    values = "VALUES({})".format(",".join(["%s" for _ in df_columns]))
+    # create INSERT INTO table (columns) VALUES('%s',...)
+    insert_stmt = "INSERT INTO {} ({}) {}".format(table, columns, values)
+    psycopg2.extras.execute_batch(cur, insert_stmt, df.values)
+    return set(df['id']) if 'id' in df else set()
+
+
+def _integer_columns(cur, table) -> set:
+    """Names of the integer typed columns of table."""
+    cur.execute("""SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+        AND data_type IN ('smallint', 'integer', 'bigint');""", (table, ))
+    return {row[0] for row in cur.fetchall()}
+
+
+def _copy_rows(cur, df, table):
+    """Bulk path for write(). Streams df through COPY FROM STDIN into a
+    temporary staging table, then moves the rows over with
+    INSERT ... ON CONFLICT DO NOTHING so ids already in table are
+    skipped instead of aborting the whole batch. Nulls are sent as
+    an explicit \\N, so empty strings stay empty strings, and integer
+    columns are cast to Int64 first, so a column holding NaNs isn't
+    written as floats ('1234.0') that COPY rejects.
+    Returns:
+        set of the ids actually inserted, if df has an id column"""
+    columns = ",".join(list(df))
+    stage = f'stage_{table}'
+    ints = _integer_columns(cur, table) & set(df)
+    df = df.assign(**{col: pd.to_numeric(df[col]).astype('Int64') for col in ints})
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep='\\N')
+    buffer.seek(0)
+    # Only the copied columns and no defaults, so the stage doesn't use up serial numbers.
+    cur.execute(f"CREATE TEMP TABLE {stage} ON COMMIT DROP AS SELECT {columns} FROM {table} WITH NO DATA;")
+    cur.copy_expert(f"COPY {stage} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N');", buffer)
+    returning = " RETURNING id" if 'id' in df else ""
+    cur.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {stage} ON CONFLICT DO NOTHING{returning};")
+    inserted = {row[0] for row in cur.fetchall()} if returning else set()
+    # Dropped now, not at commit, in case table is written again in this transaction.
+    cur.execute(f"DROP TABLE pg_temp.{stage};")
+    return inserted
+
+
+def write_df(cur, df, table, method='copy'):
+    """Writes a pd.DataFrame with an existing cursor. The 'copy' method
+    falls back to row inserts if COPY fails; the attempt is wrapped in
+    a savepoint so the fallback runs in the same transaction.
+    Args:
+        cur: cursor object
+        df: pd.DataFrame
+        table: str
+        method: str, 'copy' or 'insert'
+    Returns:
+        set of the ids written (see _copy_rows and _insert_rows)"""
+    if len(df) == 0:
+        return set()
+    if method == 'copy':
+        cur.execute("SAVEPOINT copy_write;")
+        try:
+            inserted = _copy_rows(cur, df, table)
+            cur.execute("RELEASE SAVEPOINT copy_write;")
+            return inserted
+        except psycopg2.Error as e:
+            print(f'COPY into {table} failed, falling back to inserts. {e}')
+            cur.execute("ROLLBACK TO SAVEPOINT copy_write;")
+    return _insert_rows(cur, df, table)
+
+
 @get_cursor
-def write(df, table, cur=None,):
+def write(df, table, cur=None, method='copy'):
     """Batch write method for a pd.DataFrame.
     Args:
         df: pd.DataFrame
         table: str
         cur: cursor object yielded by get_cursor decorator.
+        method: str, 'copy' (bulk COPY through a staging table,
+            skipping duplicate ids) or 'insert' (per-row inserts).
     Returns:
         None"""
-    if len(df) > 0:
-        df_columns = list(df)
-        # create (col1,col2,...)
-        columns = ",".join(df_columns)
-        # create VALUES('%s', '%s",...) one '%s' per column
-        values = "VALUES({})".format(",".join(["%s" for _ in df_columns]))
-        # create INSERT INTO table (columns) VALUES('%s',...)
-        insert_stmt = "INSERT INTO {} ({}) {}".format(table, columns, values)
-        psycopg2.extras.execute_batch(cur, insert_stmt, df.values)
+    write_df(cur, df, table, method)
     return None
 
 
+@get_cursor
+def write_tables(frames, cur=None, method='copy', parent='main'):
+    """Writes several tables in one transaction on one connection, so
+    either every table of a batch lands or none does. Rows of the other
+    tables are only written for ids this transaction inserted into
+    parent; an item already in parent (written by a concurrent
+    collector, or by an earlier run) keeps its existing imgs and bids
+    instead of getting a second copy.
+    Args:
+        frames: [(str, pd.DataFrame), ...] of table and rows, in
+            foreign key order (e.g. main before imgs and bids).
+        cur: cursor object yielded by get_cursor decorator.
+        method: str passed to write_df.
+        parent: str of the table whose new ids gate the others.
+    Returns:
+        None"""
+    inserted = None
+    for table, df in frames:
+        if table == parent:
+            inserted = write_df(cur, df, table, method)
+        else:
+            if inserted is not None and 'id' in df:
+                df = df[df['id'].isin(inserted)]
+            write_df(cur, df, table, method)
+    return None
+
+
+class BatchWriter:
+    """Accumulates scraped batches of the 'main', 'imgs' and 'bids'
+    dataframes and writes them together with write_tables. A flush
+    happens once flush_items rows of main are pending, or once
+    flush_seconds have passed since the last flush when a batch is
+    added, which amortizes commit overhead over several batches.
+    Batches of a flush that fails are kept, whole, in self.failed.
+
+    Usage:
+        with BatchWriter() as writer:
+            writer.add((df_main, df_imgs, df_bids))
+            ...
+        (exiting the block flushes whatever is pending)"""
+    def __init__(self, tables=('main', 'imgs', 'bids'), flush_items=config.get('flush_items', 50),
+                 flush_seconds=config.get('flush_seconds', 60), method='copy'):
+        self.tables = tables
+        self.flush_items = flush_items
+        self.flush_seconds = flush_seconds
+        self.method = method
+        self.pending = {table: [] for table in tables}
+        self.pending_items = 0
+        self.last_flush = time.monotonic()
+        self.failed = []
+
+    def add(self, dfs):
+        """Queues one batch and flushes if a trigger is hit.
+        Args:
+            dfs: (pd.DataFrame, ...) in the same order as self.tables
+        Returns:
+            None"""
+        for table, df in zip(self.tables, dfs):
+            self.pending[table].append(df)
+        self.pending_items += len(dfs[0])
+        if (self.pending_items >= self.flush_items
+                or time.monotonic() - self.last_flush >= self.flush_seconds):
+            self.flush()
+        return None
+
+    def flush(self):
+        """Writes all pending batches in a single transaction.
+        Returns:
+            bool of success"""
+        frames = [(table, pd.concat(dfs, ignore_index=True))
+                  for table, dfs in self.pending.items() if dfs]
+        self.pending = {table: [] for table in self.tables}
+        self.pending_items = 0
+        self.last_flush = time.monotonic()
+        if not frames:
+            return True
+        print('Writing to database...')
+        try:
+            write_tables(frames, method=self.method)
+        except Exception as e:
+            print(f'Failed to write batch. {e}')
+            self.failed.append(dict(frames))
+            return False
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+        return False
+
+
+@get_cursor
+def remove_images(paths, table='imgs', cur=None):
+    """Deletes the rows of table pointing at the given local image
+    paths, e.g. for downloads that failed after their rows were
+    written.
+    Args:
+        paths: [str, ..., str] of image save paths
+        table: str
+        cur: cursor object yielded from get_cursor decorator.
+    Returns:
+        int of rows deleted"""
+    if len(paths) == 0:
+        return 0
+    cur.execute(f"DELETE FROM {table} WHERE url = ANY(%s);", (list(paths), ))
+    return cur.rowcount
+
+
 @get_cursor
 def remove_existing_items(listings, table, cur=None,):
     """Method to remove items from listings if it already
-    exists in the Postgres table.
+    exists in the Postgres table. The candidate ids are bulk loaded
+    into a temporary table and anti-joined against table's primary
+    key, so the cost per id stays flat as table grows.
     Args:
         listings: [int, ..., int]
         table: str
         cur: cursor object yielded from get_cursor decorator.
     Returns:
-        [int, ..., int]"""
+        [int, ..., int] in the order of listings, without duplicates."""
     if len(listings) > 0:
-        str_listings = list(map(str, listings))
-        check_values = ','.join(str_listings)
-        cur.execute(f'SELECT id FROM {table} WHERE id IN ({check_values});')
-        fetched = cur.fetchall()
-        exists = [item[0] for item in fetched]
-        return list(set(listings) - set(exists))
+        buffer = io.StringIO('\n'.join(map(str, set(listings))))
+        cur.execute("CREATE TEMP TABLE candidate_ids (id BIGINT PRIMARY KEY) ON COMMIT DROP;")
+        cur.copy_expert("COPY candidate_ids (id) FROM STDIN;", buffer)
+        cur.execute(f"""SELECT c.id FROM candidate_ids c
+            WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE t.id = c.id);""")
+        missing = {item[0] for item in cur.fetchall()}
+        new_listings = []
+        for listing in listings:
+            if listing in missing:
+                new_listings.append(listing)
+                missing.discard(listing)
+        return new_listings
     else:
         return listings
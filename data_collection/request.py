@@ -1,48 +1,71 @@
 import operator
 import os
 import re
-from dataclasses import dataclass
-from html.parser import HTMLParser
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
 from itertools import chain
-from urllib.error import HTTPError
-from urllib.request import urlretrieve
 
 import numpy as np
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-from bs4.element import Tag
 
+from data_collection.download import ImageDownloader
+from data_collection.http_cache import get_cache
 from data_collection.misc import read_yaml, return_on_fail
-from data_collection.proxy_request import proxy_get, proxy_retrieve
+from data_collection.parsing import (extract_nodes, find_all_class, find_id, node_attr, node_html,
+                                     node_text, parse_html)
+from data_collection.proxy_request import proxy_get, session_get
 
 folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '../conf.yaml')
 config = read_yaml(config_file)
 secrets = read_yaml(os.path.join(folder, '..', config['secrets']))
 DOWNLOAD_PATH = config['download_path']
-
-
-class ItemCountParser(HTMLParser):
-    """Child of HTMLParser. Adds in 'data' as it is found within
-    html syntax. Look to HTMLParser docs for more details and
-    examples."""
-    data_sentence = ''
-
-    def handle_data(self, data):
-        self.data_sentence += data
+MAX_WORKERS = config.get('max_workers', 1)
+
+# Column order of the 'main', 'imgs' and 'bids' tables.
+MAIN_COLUMNS = ['id', 'price', 'cond', 'bundle', 'text',
+                'seller_percent', 'seller_score', 'rating_count',
+                'bid_summary', 'bid_duration']
+IMG_COLUMNS = ['id', 'url']
+BID_COLUMNS = ['id', 'user_id', 'score', 'bid', 'datetime']
+
+
+def get_page(url: str, proxy=False) -> str:
+    """Gets the html of url, from the response cache when it holds a
+    fresh copy (see data_collection.http_cache), or else from the
+    network. Successful responses are written back to the cache.
+    With cache_replay on, pages only come from the cache, whatever
+    their age, and a miss raises instead of going to the network.
+    Args:
+        url: str
+        proxy: bool indicated proxy usage.
+    Returns:
+        str"""
+    cache = get_cache()
+    if cache is not None:
+        page = cache.get(url)
+        if page is not None:
+            return page
+        if cache.replay:
+            raise LookupError(f'{url} is not in the response cache and cache_replay is on.')
+    response = proxy_get(url) if proxy else session_get(url)
+    if cache is not None and response.status_code == 200:
+        cache.set(url, response.text)
+    return response.text
 
 
 def get_soup(url: str, proxy=False) -> BeautifulSoup:
-    """Automated method to get BeautifulSoup object from url.
+    """Automated method to get a parsed page from url. The parser
+    backend is set by parser_backend in conf.yaml (see parse_html),
+    so query the result through the data_collection.parsing helpers.
     Args:
         url: str
         proxy: bool indicated proxy usage.
     Returns:
-        BeautifulSoup object."""
-    response = proxy_get(url) if proxy else requests.get(url)
-    page = response.text
-    soup = BeautifulSoup(page, 'lxml')
+        BeautifulSoup object or lxml.html element."""
+    page = get_page(url, proxy)
+    soup = parse_html(page)
     return soup
 
 
@@ -109,15 +132,20 @@ class ListingOptions:
         return '&'.join((self.listing_types_out, self.show_only_out, self.location_out))
 
 
-def get_listings(query: str, options=ListingOptions(), proxy=False, debug=True) -> list:
-    """Method to get all listing ids for a given query and ListingOptions.
+def iter_listing_pages(query: str, options=ListingOptions(), proxy=False, debug=True,
+                       max_workers=MAX_WORKERS):
+    """Generator over the listing ids of each search result page for a
+    given query and ListingOptions. Result pages are fetched concurrently
+    (at most max_workers at a time), but pages are always yielded in
+    page order, each one as soon as it and the pages before it arrive.
     Args:
         query: str to pass into Ebay for search.
         options: ListingOptions to control options like location, Buy It Now, etc.
         proxy: bool to control proxy usage.
         debug: bool to control debug pring messages.
-    Returns:
-        [int, ..., int]"""
+        max_workers: int for the number of pages fetched at once.
+    Yields:
+        [int, ..., int] for each page"""
     def format_search(query: str, pgn=1) -> str:
         query_keywords = query.strip().split()
         frmt_query = '+'.join(query_keywords)
@@ -128,11 +156,9 @@ def get_listings(query: str, options=ListingOptions(), proxy=False, debug=True)
 
     def count_results(url: str) -> int:
         soup = get_soup(url, proxy)
-        html_counts = str(soup.find_all(class_='srp-controls__count-heading')[0])
-        parser = ItemCountParser()
-        parser.feed(html_counts)
+        text_counts = node_text(find_all_class(soup, 'srp-controls__count-heading')[0])
         try:
-            count = parser.data_sentence.split()[0]  # Pull the numbers out of string
+            count = text_counts.split()[0]  # Pull the numbers out of string
         except Exception as e:
             print('Could not get count of all listings for the query.') if debug else False
             print(e) if debug else False
@@ -145,10 +171,10 @@ def get_listings(query: str, options=ListingOptions(), proxy=False, debug=True)
     def get_listings_single_pg(*args) -> list:
         def get_item_ids(url: str) -> list:
             soup = get_soup(url, proxy)
-            tags = soup.find_all(class_='s-item__link')
-            links = [tag['href'] for tag in tags]
+            tags = find_all_class(soup, 's-item__link')
+            links = [node_attr(tag, 'href') for tag in tags]
 
-            def rip_item_id(link: Tag) -> int:
+            def rip_item_id(link: str) -> int:
                 address = link.split('?')[0]
                 item_id = address[address.rfind('/') + 1:]
                 return int(item_id)
@@ -164,11 +190,72 @@ def get_listings(query: str, options=ListingOptions(), proxy=False, debug=True)
     count = count_results(url)
     total_pgs = count//50 + bool(count % 50)  # silly way to get a ceiling. Leaving at 50 for now.
 
-    listings = [get_listings_single_pg(query, pgn) for pgn in range(1, total_pgs + 1)]
+    if total_pgs == 0:
+        return
 
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, total_pgs))) as executor:
+        yield from executor.map(get_listings_single_pg, [query] * total_pgs, range(1, total_pgs + 1))
+
+
+def get_listings(query: str, options=ListingOptions(), proxy=False, debug=True,
+                 max_workers=MAX_WORKERS) -> list:
+    """Method to get all listing ids for a given query and ListingOptions.
+    See iter_listing_pages to consume the ids page by page instead.
+    Args:
+        query: str to pass into Ebay for search.
+        options: ListingOptions to control options like location, Buy It Now, etc.
+        proxy: bool to control proxy usage.
+        debug: bool to control debug pring messages.
+        max_workers: int for the number of pages fetched at once.
+    Returns:
+        [int, ..., int]"""
+    listings = iter_listing_pages(query, options, proxy, debug, max_workers)
     return [listing for listing in chain(*listings)]
 
 
+# One bid row's text: a 5 char masked user (a***e), their feedback score
+# in parentheses, then the amount and the 'date at time timezone' stamp.
+BID_RECORD = re.compile(r'^(?P<user_id>.{5})(?P<feedback>[^$]*)\$(?P<bid>[^.$]*\.\d{2})'
+                        r'(?P<date>.*?)\s*\bat\b\s*(?P<time>.*)$', re.S)
+# Bid time stamps once 'at' and the timezone are dropped: 'Oct 10, 2020 7:22:35 PM'.
+BID_DATETIME_FORMAT = '%b %d, %Y %I:%M:%S %p'
+
+
+def parse_bid_records(texts: list, item_id: int) -> pd.DataFrame:
+    """Parses the text of every bid row on a viewbids page at once,
+    with one compiled regex and vectorized string ops, straight to
+    typed columns. Cancelled/retracted bids and rows that don't
+    match are dropped.
+    Args:
+        texts: [str, ..., str] of bid row texts
+        item_id: int
+    Returns:
+        pd.DataFrame with BID_COLUMNS"""
+    bid_data = pd.Series(texts, dtype=object).str.strip()
+    bid_data = bid_data[~bid_data.str.contains('Cancelled|Retracted')]
+    parts = bid_data.str.extract(BID_RECORD).dropna(subset=['bid'])
+
+    # Score is the last token after the last '(', minus the ')'.
+    score = parts.feedback.str.rsplit('(', n=1).str[-1].str.split().str[-1].str[:-1]
+    score = score.where(parts.user_id.str.lower() != 'start')  # Starting price row has no bidder.
+    bid = parts.bid.where(~parts.bid.str.contains('[a-zA-Z]'), '0.00')  # Non-US currency.
+    time = parts.time.str.strip().str.replace(r'\s+[A-Z]{3,5}$', '', regex=True)  # Removing timezone info
+    stamp = parts.date.str.strip() + ' ' + time
+    # An explicit format skips dateutil's per-row guessing; only rows it misses fall back to it.
+    datetime = pd.to_datetime(stamp, format=BID_DATETIME_FORMAT, errors='coerce')
+    missed = datetime.isna() & stamp.notna()
+    if missed.any():
+        datetime[missed] = pd.to_datetime(stamp[missed], errors='coerce')
+    df_records = pd.DataFrame({
+        'id': item_id,
+        'user_id': parts.user_id,
+        'score': pd.to_numeric(score, errors='coerce').astype('Int64'),
+        'bid': pd.to_numeric(bid.str.replace(',', '', regex=False), errors='coerce'),
+        'datetime': datetime,
+    }, columns=BID_COLUMNS)
+    return df_records.reset_index(drop=True)
+
+
 @dataclass
 class Item:
     """Object to store all item info from listing page for a
@@ -177,7 +264,11 @@ class Item:
     to a NaN-like string or int. This is critical as the html
     for the Ebay pages will, eventually, be altered and ruin
     the existing methods. They should be updated regularly to
-    accommodate this."""
+    accommodate this.
+
+    The page soup is fetched lazily on first access of self.soup
+    and cached on the instance, so creating an Item (or importing
+    this module) does no network I/O."""
     item_id: int = 0
     price: float = 0.0
     cond: str = 'N/A'
@@ -187,32 +278,101 @@ class Item:
     seller_score: int = 0
     rating_count: int = 0
     images: tuple = ()
-    bids: pd.DataFrame = pd.DataFrame({})
+    image_sources: tuple = ()
+    bids: pd.DataFrame = field(default_factory=pd.DataFrame)
     bid_summary: str = 'N/A'
     bid_duration: str = 'N/A'
-    url: str = f"https://www.ebay.com/itm/{item_id}"
-    soup:  BeautifulSoup = get_soup(url)
+    url: str = ''
     proxy: bool = False
+    _soup: BeautifulSoup = field(default=None, repr=False)
+    _bid_soup: BeautifulSoup = field(default=None, repr=False)
+    _nodes: dict = field(default=None, repr=False)
+
+    def __post_init__(self):
+        if not self.url:
+            self.url = self.get_url()
+
+    @property
+    def soup(self) -> BeautifulSoup:
+        if self._soup is None:
+            self._soup = self.get_soup()
+        return self._soup
+
+    @soup.setter
+    def soup(self, soup: BeautifulSoup):
+        self._soup = soup
+        self._nodes = None
+
+    @property
+    def nodes(self) -> dict:
+        """Nodes of the item page needed by the get_* methods,
+        gathered in a single pass over self.soup (see extract_nodes)."""
+        return self.load_nodes()
+
+    @property
+    def bid_soup(self) -> BeautifulSoup:
+        """Soup of the viewbids page, shared by get_bid_summary
+        and get_bidding_history so the page is fetched once."""
+        return self.load_bid_soup()
+
+    @bid_soup.setter
+    def bid_soup(self, soup: BeautifulSoup):
+        self._bid_soup = soup
 
     def get_url(self, bid_done=False) -> str:
         orig = 'nordt=true&orig_cvip=true' if bid_done else ''
         return f"https://www.ebay.com/itm/{self.item_id}?{orig}"
 
+    def get_bid_url(self) -> str:
+        return f"https://www.ebay.com/bfl/viewbids/{self.item_id}?item={self.item_id}&rt=nc"
+
     def get_soup(self) -> BeautifulSoup:
         return get_soup(self.url, self.proxy)
 
+    def load_nodes(self) -> dict:
+        """Fetches and parses the item page, if not done yet.
+        Returns:
+            dict of the item page nodes (see nodes)"""
+        if self._nodes is None:
+            self._nodes = extract_nodes(self.soup)
+        return self._nodes
+
+    def load_bid_soup(self) -> BeautifulSoup:
+        """Fetches the viewbids page, if not done yet.
+        Returns:
+            BeautifulSoup"""
+        if self._bid_soup is None:
+            self._bid_soup = get_soup(self.get_bid_url(), self.proxy)
+        return self._bid_soup
+
     def update_init(self, **kwargs):
-        """Method to gather both the relevant url and BeautifulSoup."""
+        """Method to set the relevant url. The BeautifulSoup for it
+        is fetched on the next access of self.soup."""
         self.url = self.get_url(**kwargs)
-        self.soup = self.get_soup()
-
-    def get_item_data(self, debug=False, **kwargs) -> tuple:
+        self.soup = None
+        self.bid_soup = None
+
+    def fetch(self):
+        """Fetches the item and viewbids pages, if not done yet. Unlike
+        the get_* methods this is not guarded by return_on_fail, so a
+        failed request fails the item instead of leaving every field
+        at its default."""
+        self.load_nodes()
+        self.load_bid_soup()
+        return None
+
+    def get_item_data(self, debug=False, main_text=True, **kwargs) -> tuple:
         """Main method to be called. Calls all other data collecting methods
-        that aren't called in update_init()."""
+        that aren't called in update_init(). With main_text=False the
+        seller description (a separate page) is not fetched and
+        self.text is left as is. Raises if the item's pages can't be
+        fetched (see fetch)."""
+        self.fetch()
         self.price = self.get_curr_price(debug=debug)
         self.cond = self.get_condition(debug=debug)
         self.bundle = self.get_custom_bundle(debug=debug)
-        self.text = self.get_main_text(debug=debug)
+        if main_text:
+            self.text = self.get_main_text(debug=debug)
         self.seller_percent = self.get_feedback_percent(debug=debug)
         self.seller_score = self.get_feedback_score(debug=debug)
         self.rating_count = self.get_product_rating_count(debug=debug)
@@ -224,11 +384,9 @@ class Item:
 
     @return_on_fail(None)
     def get_curr_price(self, debug=False) -> float:
-        dollar_html = str(self.soup.find_all(class_='notranslate')[0])
-        parser = ItemCountParser()
-        parser.feed(dollar_html)
+        dollar_text = node_text(self.nodes['notranslate'][0])
         try:
-            dollars = parser.data_sentence.split()[1]  # Pull the numbers out of string
+            dollars = dollar_text.split()[1]  # Pull the numbers out of string
         except Exception as e:
             print(f'Could not get dollars for query {self.item_id}.') if debug else False
             print(e) if debug else False
@@ -243,61 +401,54 @@ class Item:
 
     @return_on_fail('N/A')
     def get_condition(self, debug=False):
-        cond_html = str(self.soup.find_all(class_='condText')[0])
-        parser = ItemCountParser()
-        parser.feed(cond_html)
-        return parser.data_sentence
+        return node_text(self.nodes['condText'][0])
 
     @return_on_fail('N/A')
     def get_custom_bundle(self, debug=False):
-        bundle_html = str(self.soup.find_all(class_='prodDetailSec')[0])
-        parser = ItemCountParser()
-        parser.feed(bundle_html)
-        if 'No\n' in parser.data_sentence:
+        bundle_text = node_text(self.nodes['prodDetailSec'][0])
+        if 'No\n' in bundle_text:
             return 'No'
-        elif 'Yes\n' in parser.data_sentence:
+        elif 'Yes\n' in bundle_text:
             return 'Yes'
         else:
             print(f'Could not get bundle info for query {self.item_id}.') if debug else False
             return 'N/A'
 
+    @return_on_fail(None)
+    def get_desc_url(self, debug=False):
+        """Url of the seller description page (see get_main_text)."""
+        return node_attr(self.nodes['desc_ifr'][0], 'src')
+
     @return_on_fail('N/A')
-    def get_main_text(self, debug=False):
+    def get_main_text(self, debug=False, desc_soup=None):
         """Get the main seller text from the page.
         This one is a bit trickier, need to pull a url
         from the seller page that redirects to another.
+        Pass desc_soup to parse an already fetched description
+        page instead.
 
         :return str
         """
-        url_to_seller_text = self.soup.find(id='desc_ifr')['src']
-        seller_soup = get_soup(url_to_seller_text, self.proxy)
-        text_html = str(seller_soup.find(id='ds_div'))
-        parser = ItemCountParser()
-        parser.feed(text_html)
-        return parser.data_sentence.strip()
+        if desc_soup is None:
+            desc_soup = get_soup(self.get_desc_url(), self.proxy)
+        return node_text(find_id(desc_soup, 'ds_div')).strip()
 
     @return_on_fail(np.nan)
     def get_feedback_percent(self, debug=False) -> float:
         """Return the sellers feedback percentage. 0-100"""
-        url_to_seller_text = str(self.soup.find(id='si-fb'))
-        parser = ItemCountParser()
-        parser.feed(url_to_seller_text)
-        return float(parser.data_sentence.split('%')[0])
+        feedback_text = node_text(self.nodes['si-fb'][0])
+        return float(feedback_text.split('%')[0])
 
     @return_on_fail(np.nan)
     def get_feedback_score(self, debug=False) -> int:
-        score_html = str(self.soup.find_all(class_='mbg-l')[0])
-        parser = ItemCountParser()
-        parser.feed(score_html)
-        return int(parser.data_sentence.strip().split('\n')[0][1:])
+        score_text = node_text(self.nodes['mbg-l'][0])
+        return int(score_text.strip().split('\n')[0][1:])
 
     @return_on_fail(np.nan)
     def get_product_rating_count(self, debug=False) -> int:
-        review_html = str(self.soup.find_all(class_='prodreview')[0])
-        parser = ItemCountParser()
-        parser.feed(review_html)
+        review_text = node_text(self.nodes['prodreview'][0])
         try:
-            review_count = parser.data_sentence.split()[0]  # Pull the numbers out of string
+            review_count = review_text.split()[0]  # Pull the numbers out of string
         except Exception as e:
             print(f'Could not get dollars for query {self.item_id}.') if debug else False
             print(e) if debug else False
@@ -309,12 +460,18 @@ class Item:
 
     @return_on_fail(tuple('N/A'))
     def get_images(self, size='thumb', debug=False) -> tuple:
+        """Collects image urls and their local save paths. Nothing is
+        downloaded here; the (url, save_path) pairs are kept on
+        self.image_sources for an ImageDownloader to fetch.
+
+        :return (str, ..., str) of local image paths
+        """
         size = size.lower()
         if size.lower() not in ['thumb', 'full']:
             print('image size not recognized; defaulting to thumbnail.')
             size = 'thumb'
 
-        image_urls_html = self.soup.find_all(class_='tdThumb')
+        image_urls_html = self.nodes['tdThumb']
 
         def rough_parser(thumb: str) -> str:
             mark_1 = thumb.find("https://i.ebayimg.com/images/g/")
@@ -324,76 +481,25 @@ class Item:
         def get_full_size_url(thumb_url: str) -> str:
             return thumb_url.replace('s-l64', 's-l1600')
 
-        image_urls = list(map(lambda x: rough_parser(str(x)), image_urls_html))
-        image_urls = list(set(image_urls))
+        image_urls = list(map(lambda x: rough_parser(node_html(x)), image_urls_html))
+        image_urls = sorted(set(image_urls))  # Sorted so save paths are stable across runs.
         if size == 'full':
             image_urls = list(map(get_full_size_url, image_urls))
-        image_location = []
-        for i, image in enumerate(image_urls):
-            try:
-                save_path = f'{DOWNLOAD_PATH}{self.item_id}{size}_{i}.jpg'
-                if self.proxy:
-                    proxy_retrieve(image, save_path)
-                else:
-                    urlretrieve(image, save_path)
-                image_location.append(save_path)
-            except HTTPError as e:
-                print(e) if debug else False
-                print(f'Failed to get image for {self.item_id} img #{i}') if debug else False
-        return tuple(image_location)
+        image_location = tuple(f'{DOWNLOAD_PATH}{self.item_id}{size}_{i}.jpg'
+                               for i in range(len(image_urls)))
+        self.image_sources = tuple(zip(image_urls, image_location))
+        return image_location
 
     @return_on_fail(pd.DataFrame({}))
     def get_bidding_history(self, ) -> pd.DataFrame:
-        url = f"https://www.ebay.com/bfl/viewbids/{self.item_id}?item={self.item_id}&rt=nc"
-        soup = get_soup(url, self.proxy)
-        records_html = soup.find_all(class_='ui-component-table_tr_detailinfo')
-
-        def record_parser(record):
-            if 'Cancelled' in record or 'Retracted' in record:
-                return None
-            parser = ItemCountParser()
-            parser.feed(record)
-            bid_data = parser.data_sentence
-            bid_user = bid_data[:5]  # Will have the form of a***e.
-            feedback_chunk, amt_time_chunk = bid_data.split('$')
-            if bid_user.lower() == 'start':
-                user_score = np.nan
-            else:
-                user_score = feedback_chunk.split('(')[-1].split()[-1][:-1]  # NASTY LINE
-            dollar_dec_loc = amt_time_chunk.find('.')
-            bid_amt = amt_time_chunk[:dollar_dec_loc + 3]
-            if re.search('[a-zA-Z]', bid_amt):  # Check if we have any non-US currency.
-                bid_amt = '0.00'
-            dt = amt_time_chunk[dollar_dec_loc + 3:]
-
-            def clean_datetime(dt):
-                date, time = dt.split('at')
-                date, time = date.strip(), time.strip()
-                # if len(time) < 14:
-                #     time = '0' + time  # Zero-padding once to get formatting consistent for pd.to_datetime()
-                time = time[:-3]  # Removing timezone info
-                return date, time
-
-            date, time = clean_datetime(dt)
-            return bid_user, user_score, bid_amt, f'{date} {time}'
-
-        records = list(map(lambda record: record_parser(str(record)), records_html))
-        valid_records = [record for record in records if record]
-        col_names = ['user_id', 'score', 'bid', 'datetime']
-        df_records = pd.DataFrame(valid_records, columns=col_names)
-        df_records['id'] = self.item_id
-        df_return = df_records[['id', 'user_id', 'score', 'bid', 'datetime']]  # Reordering columns for easy sql later.
+        records_html = find_all_class(self.bid_soup, 'ui-component-table_tr_detailinfo')
+        df_return = parse_bid_records([node_text(record) for record in records_html], self.item_id)
         self.bids = df_return
         return df_return
 
     @return_on_fail('N/A')
     def get_bid_summary(self, debug=False):
-        url = f"https://www.ebay.com/bfl/viewbids/{self.item_id}?item={self.item_id}&rt=nc"
-        soup = get_soup(url, self.proxy)
-        record_html = str(soup.find_all(class_='app-bid-info_wrapper')[0])
-        parser = ItemCountParser()
-        parser.feed(record_html)
-        data = parser.data_sentence
+        data = node_text(find_all_class(self.bid_soup, 'app-bid-info_wrapper')[0])
         return data, data.split('Duration:')[-1]
 
 
@@ -422,27 +528,62 @@ def nan_to_none(f):
     return _return_f
 
 
+def scrape_item(listing, bid_done=False, downloader=None, **kwargs) -> tuple:
+    """Runs the full scraping routine on a single Item: the
+    item page, its data and its bidding history. Images found
+    on the page are queued on downloader, not fetched here.
+    Args:
+        listing: Item
+        bid_done: bool to control if bids should be accounted
+        downloader: ImageDownloader or None to skip image downloads
+        kwargs: the parameters to feed to Item.get_item_data
+    Returns:
+        tuple (see Item.get_item_data)"""
+    listing.update_init(bid_done=bid_done)
+    data = listing.get_item_data(**kwargs)
+    if downloader is not None:
+        for image_url, save_path in listing.image_sources:
+            downloader.submit(image_url, save_path, listing.proxy)
+    listing.get_bidding_history()
+    return data
+
+
 @nan_to_none
-def df_data_on_listings(listings: list, bid_done=False, **kwargs) -> pd.DataFrame:
-    """Method to gather item data into dataframe. This method
-    is currently doing too much and causes bad coupling. Should
-    separate out the for loop into it's own function.
+def df_data_on_listings(listings: list, bid_done=False, max_workers=1, downloader=None,
+                        **kwargs) -> pd.DataFrame:
+    """Method to gather item data into dataframe. Items are
+    scraped concurrently on a thread pool when max_workers > 1,
+    since nearly all of the time spent per item is waiting on
+    the network. Row order always follows the order of listings.
     Args:
         listings: [Item, ..., Item] list of Items
         bid_done: bool to control if bids should be accounted
+        max_workers: int for the number of items scraped at once
+        downloader: ImageDownloader to queue images on. If None, a
+            new one is used and waited on before returning.
         kwargs: the parameters to feed to Item.get_item_data
     Return:
         pd.DataFrame"""
-    data = []
-    for i, listing in enumerate(listings):
-        print(f'Progress: {i}/{len(listings)}')
-        listing.update_init(bid_done=bid_done)
-        data.append(listing.get_item_data(**kwargs))
-        listing.get_bidding_history()
-    columns = ['id', 'price', 'cond', 'bundle', 'text',
-               'seller_percent', 'seller_score', 'rating_count',
-               'bid_summary', 'bid_duration']
-    df = pd.DataFrame(data, columns=columns)
+    own_downloader = downloader is None
+    if own_downloader:
+        downloader = ImageDownloader()
+    data = [None] * len(listings)
+    try:
+        if max_workers > 1:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {executor.submit(scrape_item, listing, bid_done, downloader, **kwargs): i
+                           for i, listing in enumerate(listings)}
+                for done, future in enumerate(as_completed(futures)):
+                    print(f'Progress: {done}/{len(listings)}')
+                    data[futures[future]] = future.result()
+        else:
+            for i, listing in enumerate(listings):
+                print(f'Progress: {i}/{len(listings)}')
+                data[i] = scrape_item(listing, bid_done, downloader, **kwargs)
+    finally:
+        if own_downloader:
+            downloader.close()
+    df = pd.DataFrame(data, columns=MAIN_COLUMNS)
     return df
 
 
@@ -457,8 +598,7 @@ def df_image_addresses(listings: list) -> pd.DataFrame:
     for listing in listings:
         for image_url in listing.images:
             data.append((listing.item_id, image_url))
-    columns = ['id', 'url']
-    df = pd.DataFrame(data, columns=columns).reset_index(drop=True)
+    df = pd.DataFrame(data, columns=IMG_COLUMNS).reset_index(drop=True)
     df.index.rename('idx', inplace=True)
     return df
 
@@ -475,6 +615,24 @@ def df_bid_histories(listings: list) -> pd.DataFrame:
     return df
 
 
+def collect_items(listings: list, bid_done=False, max_workers=MAX_WORKERS, downloader=None,
+                  **kwargs) -> tuple:
+    """Collection engine for a batch of Items. Scrapes all items
+    concurrently (at most max_workers at a time) and returns the
+    dataframes for the 'main', 'imgs' and 'bids' tables.
+    Args:
+        listings: [Item, ..., Item] list of Items
+        bid_done: bool to control if bids should be accounted
+        max_workers: int for the number of items scraped at once
+        downloader: ImageDownloader (see df_data_on_listings)
+        kwargs: the parameters to feed to Item.get_item_data
+    Returns:
+        (pd.DataFrame,) * 3"""
+    df_main = df_data_on_listings(listings, bid_done=bid_done, max_workers=max_workers,
+                                  downloader=downloader, **kwargs)
+    return df_main, df_image_addresses(listings), df_bid_histories(listings)
+
+
 # x = [114230556674, 143595870217]
 # item = Item(x[0], proxy=True)
 # df = df_data_on_listings([item], bid_done=True)
@@ -26,8 +26,10 @@ filter_choices = [img_filter_mapping[choice] for choice in img_filters]
 min_price = st.sidebar.slider('Min Price', 0, 50, 0)
 max_price = st.sidebar.slider('Max Price', 50, 200, 200)
 
-# Read in data from PSQL
+# Read in data from PSQL. Counts come back as nullable Int32, whose
+# pd.NA matplotlib can't plot, so they are widened to float here.
 df, df_imgs, df_bids = get_dfs()
+df = df.astype({'seller_score': 'float64', 'rating_count': 'float64'})
 
 
 # Perform NLP formatting
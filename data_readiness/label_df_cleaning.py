@@ -1,4 +1,5 @@
 import os
+import numpy as np
 import pandas as pd
 
 from data_collection.misc import read_yaml
@@ -10,6 +11,9 @@ config = read_yaml(config_file)
 img_path = config['download_path']
 label_path = img_path + 'labels.csv'
 
+# Grouped labels keyed by the mtime of labels.csv they were parsed from.
+_label_cache = {'mtime': None, 'df': None}
+
 
 def get_df_labels():
     """Reads in label csv. This csv is generated
@@ -18,18 +22,41 @@ def get_df_labels():
                        dtype={'features': str}).reset_index(drop=True)
 
 
+def get_grouped_labels():
+    """Returns the label csv after img_df_feature_prep(),
+    parsing it only when labels.csv has changed since the
+    last call. The cached frame is shared, so callers
+    should copy before modifying it in place.
+    Returns:
+        pd.DataFrame"""
+    mtime = os.path.getmtime(label_path)
+    if _label_cache['mtime'] != mtime:
+        _label_cache['df'] = img_df_feature_prep(get_df_labels())
+        _label_cache['mtime'] = mtime
+    return _label_cache['df']
+
+
 def expand_feature_string(df):
     """Method that converts label string column
     into individual columns. E.g., '1001010'
     would get cast into 7 new columns. The original
-    'features' col is removed.
+    'features' col is removed. All label strings are
+    decoded at once through a byte view into a uint8
+    matrix, one column per feature.
     Args:
         df: pd.DataFrame
     Returns:
         pd.DataFrame"""
+    n = len(features)
+    labels = df.pop('features').str[:n]
+    if not (labels.str.len() == n).all():
+        raise ValueError(f'Label strings must have at least {n} characters.')
+    raw = ''.join(labels).encode('ascii', errors='replace')
+    bits = np.frombuffer(raw, dtype=np.uint8).reshape(-1, n) - ord('0')
+    if (bits > 9).any():
+        raise ValueError('Label strings must only contain digits.')
     for i, feature in enumerate(features):
-        df[feature] = df.features.str[i].astype(int)
-    del df["features"]
+        df[feature] = bits[:, i]
     return df
 
 
@@ -43,10 +70,10 @@ def feature_group(df):
         df: pd.DataFrame
     Returns:
         pd.DataFrame"""
-    def trunc_img_name(text):
-        return text[:text.find('full')]
-
-    df['item'] = df.apply(lambda row: trunc_img_name(row['img_name']), axis=1)
+    # Item id is everything before 'full' in the image name; names
+    # without it lose their last character, as str.find() == -1 did.
+    names = df['img_name']
+    df['item'] = names.str.extract(r'^(.*?)full', expand=False).fillna(names.str[:-1])
     df = df.drop(columns='img_name')
     grouped_df = df.groupby(by='item').max().reset_index()
     return grouped_df
@@ -78,6 +105,29 @@ def filter_irrelevant(df):
     ].copy()
 
 
+def get_filter_mask(df, option=('all', )):
+    """Boolean mask of the rows kept by the filters
+    for the option(s) given; see get_filtered_img_df.
+    Args:
+        df: pd.DataFrame
+        option: (str, ..., str) or str
+    Returns:
+        pd.Series of bool"""
+    if type(option) == str:
+        option = (option, )
+    option = tuple([opt for opt in option])
+    option = tuple(map(lambda x: x.lower(), option))
+
+    mask = pd.Series(True, index=df.index)
+    if 'cases' or 'all' in option:
+        mask &= df['Multiple Cases'] == 0
+    if 'discs' or 'all' in option:
+        mask &= df['Multiple Discs'] == 0
+    if 'irr' or 'all' in option:
+        mask &= ~((df['Disc'] == 0) & (df['Case'] == 0) & (df['Manual'] == 0))
+    return mask
+
+
 def get_filtered_img_df(df, option=('all', )):
     """Calls the relevant filters based on the
     option(s) given. Options include 'all',
@@ -91,18 +141,7 @@ def get_filtered_img_df(df, option=('all', )):
         option: (str, ..., str) or str
     Returns:
         pd.DataFrame"""
-    if type(option) == str:
-        option = (option, )
-    option = tuple([opt for opt in option])
-    option = tuple(map(lambda x: x.lower(), option))
-
-    if 'cases' or 'all' in option:
-        df = filter_multi_cases(df)
-    if 'discs' or 'all' in option:
-        df = filter_multi_discs(df)
-    if 'irr' or 'all' in option:
-        df = filter_irrelevant(df)
-    return df
+    return df[get_filter_mask(df, option)].copy()
 
 
 def filter_img_df(img_df, options):
@@ -117,10 +156,19 @@ def filter_img_df(img_df, options):
 
 def filter_img_df_complement(img_df, options):
     """Similar to filter_img_df, but returns the filtered out rows instead."""
-    df = img_df.copy()
-    df = get_filtered_img_df(df, options)
-    df_complement = img_df[~img_df.item.isin(df.item)]
-    return df_complement
+    return img_df[~get_filter_mask(img_df, options)].copy()
+
+
+def split_img_df(img_df, options):
+    """Splits the image dataframe into the rows kept by
+    filter_img_df and the rows filtered out, from one mask.
+    Args:
+        img_df: pd.DataFrame
+        options: (str,) same as for filter_img_df
+    Returns:
+        (pd.DataFrame, pd.DataFrame) of (kept, filtered out)"""
+    mask = get_filter_mask(img_df, options)
+    return img_df[mask].copy(), img_df[~mask].copy()
 
 
 def image_label_filter(options, verbose=False):
@@ -132,8 +180,7 @@ def image_label_filter(options, verbose=False):
         verbose: bool
         Controls whether or not extra printing should occur.
         """
-    label_df = get_df_labels()
-    label_df = img_df_feature_prep(label_df)
+    label_df = get_grouped_labels()
     if verbose:
         print(f"Count of items before filtering: {label_df.shape[0]}")
     label_df = filter_img_df(label_df, options)
@@ -151,8 +198,7 @@ def image_label_filter_complement(options, verbose=False):
         verbose: bool
         Controls whether or not extra printing should occur.
         """
-    label_df = get_df_labels()
-    label_df = img_df_feature_prep(label_df)
+    label_df = get_grouped_labels()
     prev_count = label_df.shape[0]
     if verbose:
         print(f"Count of items before filtering: {prev_count}")
@@ -162,7 +208,7 @@ def image_label_filter_complement(options, verbose=False):
     return label_df
 
 
-def join_to_main_df(df, *args, **kwargs):
+def join_to_main_df(df, options=('all', ), verbose=False):
     """Method that reads in label dataframe from csv
     and joins it properly to the main dataframe. Note
     that there is some complexity in this step to avoid
@@ -170,12 +216,16 @@ def join_to_main_df(df, *args, **kwargs):
     being present in an image.
     Args:
         df: pd.DataFrame
-        *args, **kwargs: to be passed to image_label_filter
-        and image_label_filter_complement
+        options: (str,) same as for filter_img_df
+        verbose: bool
     Returns:
         pd.DataFrame"""
-    df_labels = image_label_filter(*args)
-    complement = image_label_filter_complement(*args, **kwargs)
+    label_df = get_grouped_labels()
+    if verbose:
+        print(f"Count of items before filtering: {label_df.shape[0]}")
+    df_labels, complement = split_img_df(label_df, options)
+    if verbose:
+        print(f"Count of filtered items: {complement.shape[0]}")
     df_filtered = df[~df.id.isin(complement.item)]
     df_labels = df_labels.rename(columns={'item': 'id'})
     df_labels['id'] = df_labels['id'].astype('int64')
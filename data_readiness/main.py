@@ -1,15 +1,18 @@
 import os
 
-from data_readiness.read_db import get_dfs
+from data_readiness.read_db import sync_table
 from data_readiness.label_df_cleaning import join_to_main_df as img_join
 from data_readiness.text_preprocess import nlp_join, get_nlp_df
 from data_collection.misc import read_yaml
+from modeling.prep import sparse_columns, write_sparse_frame
 
 folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '..', 'conf.yaml')
 config = read_yaml(config_file)
 csv_path = config['csv_path']
-data_path = csv_path + 'train.csv'
+train_format = config.get('train_format', 'parquet')
+data_path = csv_path + ('train.parquet' if train_format == 'parquet' else 'train.csv')
+nlp_path = csv_path + 'train_nlp.npz'
 
 if not os.path.exists(csv_path):
     os.mkdir(csv_path)
@@ -18,8 +21,9 @@ if not os.path.exists(csv_path):
 # Allow price thresholding
 price_range = (20, 100)
 
-# Read in data from PSQL
-df, _, _ = get_dfs()
+# Read in data from PSQL. Only main is needed here, so imgs and bids
+# (by far the largest table) are never loaded.
+df = sync_table('main')
 
 # Collect NLP data with above method.
 nlp_df = get_nlp_df(df)
@@ -48,4 +52,10 @@ def df_filtering(df, prices, img_opts='all', nlp=True, **kwargs):
 
 if __name__ == '__main__':
     df = df_filtering(df, price_range)
-    df.to_csv(data_path)
+    # NLP features stay sparse in a side-car .npz next to the training data.
+    nlp_cols = sparse_columns(df)
+    write_sparse_frame(df[nlp_cols], nlp_path)
+    if train_format == 'parquet':
+        df.drop(columns=nlp_cols).to_parquet(data_path, index=True)
+    else:
+        df.drop(columns=nlp_cols).to_csv(data_path)
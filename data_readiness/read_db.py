@@ -1,4 +1,6 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import os
 
 from data_collection.misc import read_yaml
@@ -9,22 +11,210 @@ folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '..', 'conf.yaml')
 config = read_yaml(config_file)
 secrets = read_yaml(os.path.join(folder, '..', config['secrets']))
+snapshot_path = config['snapshot_path']
 
+# Key of each table. Snapshots are synced by diffing keys against the
+# table, not by a high-water mark: SERIAL numbers are handed out at
+# insert time, not commit time, so a lower idx can still commit after
+# a sync has read past it.
+keys = {'main': 'id', 'imgs': 'idx', 'bids': 'idx'}
 
-def psql_to_pandas(query=''):
-    """Method to read in generic query from PSQL DB.
+# Compact dtypes per table. Text columns with few distinct values become
+# categories, NUMERIC prices float32 and counts/scores nullable Int32.
+dtypes = {
+    'main': {'price': 'float32', 'cond': 'category', 'bundle': 'category',
+             'seller_percent': 'float32', 'seller_score': 'Int32', 'rating_count': 'Int32'},
+    'imgs': {},
+    'bids': {'user_id': 'category', 'score': 'Int32', 'bid': 'float32'},
+}
+chunk_size = 50000
+
+# Arrow type per PSQL column type, and per compact dtype, for snapshots
+# streamed to Parquet. Anything else is stored as a string.
+arrow_types = {'bigint': pa.int64(), 'integer': pa.int32(), 'smallint': pa.int16(),
+               'numeric': pa.float64(), 'timestamp without time zone': pa.timestamp('us')}
+arrow_dtypes = {'float32': pa.float32(), 'Int32': pa.int32()}
+
+
+def apply_dtypes(df, dtypes=None):
+    """Casts the columns of df named in dtypes, in place.
+    Args:
+        df: pd.DataFrame
+        dtypes: dict of column to dtype, or None
+    Returns:
+        pd.DataFrame"""
+    for col, dtype in (dtypes or {}).items():
+        if col not in df.columns:
+            continue
+        if dtype != 'category':
+            df[col] = df[col].astype('float64')  # Handles Decimal and None from psycopg2.
+        df[col] = df[col].astype(dtype)
+    return df
+
+
+def psql_iter_chunks(query='', params=None, dtypes=None, chunksize=chunk_size):
+    """Generator reading a query from PSQL in chunks through a named
+    (server-side) cursor, so at most chunksize rows are held in
+    memory at once, on the client or in transit.
     Args:
         query: str
+        params: dict of query parameters, or None
+        dtypes: dict of column to dtype (see apply_dtypes), or None
+        chunksize: int of rows per chunk
+    Yields:
+        pd.DataFrame (at least one, possibly empty)"""
+    conn = psql_connect(config, secrets)
+    try:
+        with conn.cursor(name='read_db_stream') as cur:
+            cur.itersize = chunksize
+            cur.execute(query, params)
+            rows = cur.fetchmany(chunksize)
+            columns = [col[0] for col in cur.description]
+            yield apply_dtypes(pd.DataFrame.from_records(rows, columns=columns), dtypes)
+            while rows:
+                rows = cur.fetchmany(chunksize)
+                if rows:
+                    yield apply_dtypes(pd.DataFrame.from_records(rows, columns=columns), dtypes)
+    finally:
+        conn.close()
+
+
+def psql_to_pandas(query='', params=None, dtypes=None, chunksize=chunk_size):
+    """Method to read in generic query from PSQL DB. The chunks are
+    gathered into one dataframe, so memory is bounded by the size of
+    the result; consume psql_iter_chunks directly to stay within a
+    chunk (as stream_snapshot does).
+    Args:
+        query: str
+        params: dict of query parameters, or None
+        dtypes: dict of column to dtype (see apply_dtypes), or None
+        chunksize: int of rows per chunk read (see psql_iter_chunks)
+    Returns:
+        pd.DataFrame"""
+    chunks = list(psql_iter_chunks(query, params, dtypes, chunksize))
+    df = pd.concat(chunks, ignore_index=True) if len(chunks) > 1 else chunks[0]
+    return apply_dtypes(df, dtypes)  # Categories of separate chunks are unioned into object.
+
+
+def table_oid(table):
+    """OID of table. A table that is dropped and made again gets a new one."""
+    return int(psql_to_pandas('SELECT to_regclass(%(table)s)::oid::bigint AS oid;', {'table': table}).oid[0])
+
+
+def read_snapshot(table, oid=None):
+    """Reads the local Parquet snapshot of table, or None if there is
+    none, or if it was taken of a table with another oid (see table_oid)."""
+    path = os.path.join(snapshot_path, f'{table}.parquet')
+    if not os.path.exists(path):
+        return None
+    metadata = pq.read_schema(path).metadata or {}
+    if oid is not None and metadata.get(b'oid') != str(oid).encode():
+        return None
+    return pd.read_parquet(path)
+
+
+def write_snapshot(df, table, oid):
+    """Writes the local Parquet snapshot of table, tagged with the oid
+    of the table it was read from. The file is replaced atomically, so
+    an interrupted write never leaves a broken snapshot."""
+    if not os.path.exists(snapshot_path):
+        os.makedirs(snapshot_path)
+    path = os.path.join(snapshot_path, f'{table}.parquet')
+    arrow_table = pa.Table.from_pandas(df, preserve_index=False)
+    metadata = {**(arrow_table.schema.metadata or {}), b'oid': str(oid).encode()}
+    pq.write_table(arrow_table.replace_schema_metadata(metadata), path + '.tmp')
+    os.replace(path + '.tmp', path)
+    return None
+
+
+def arrow_schema(table, dtypes=None):
+    """Arrow schema of the columns of table, with the compact dtypes
+    applied. Category columns are kept as strings.
+    Args:
+        table: str
+        dtypes: dict of column to dtype (see apply_dtypes), or None
+    Returns:
+        pa.Schema"""
+    columns = psql_to_pandas("""SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %(table)s
+        ORDER BY ordinal_position;""", {'table': table})
+    dtypes = dtypes or {}
+    return pa.schema([(name, arrow_dtypes.get(dtypes.get(name), arrow_types.get(data_type, pa.string())))
+                      for name, data_type in zip(columns.column_name, columns.data_type)])
+
+
+def stream_snapshot(table, oid, dtypes=None, chunksize=chunk_size):
+    """Reads all of table into its local Parquet snapshot one chunk at a
+    time (see psql_iter_chunks), so it is never held in memory in full.
+    Category columns are written as strings; apply dtypes when reading
+    the snapshot back.
+    Args:
+        table: str
+        oid: int the snapshot is tagged with (see table_oid)
+        dtypes: dict of column to dtype (see apply_dtypes), or None
+        chunksize: int of rows per chunk
+    Returns:
+        None"""
+    if not os.path.exists(snapshot_path):
+        os.makedirs(snapshot_path)
+    path = os.path.join(snapshot_path, f'{table}.parquet')
+    dtypes = {col: dtype for col, dtype in (dtypes or {}).items() if dtype != 'category'}
+    schema = arrow_schema(table, dtypes)
+    writer = None
+    try:
+        for chunk in psql_iter_chunks(f'SELECT * FROM {table};', dtypes=dtypes, chunksize=chunksize):
+            arrow_chunk = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                metadata = {**(arrow_chunk.schema.metadata or {}), b'oid': str(oid).encode()}
+                writer = pq.ParquetWriter(path + '.tmp', arrow_chunk.schema.with_metadata(metadata))
+            writer.write_table(arrow_chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    os.replace(path + '.tmp', path)
+    return None
+
+
+def sync_table(table, refresh=False):
+    """Brings the local snapshot of table up to date and returns it.
+    Only the keys of the table are read in full; rows are only read
+    for keys missing from the snapshot, and snapshot rows whose key is
+    gone upstream are dropped. So the cost grows with new data rather
+    than with the whole table. A table that was rebuilt since the last
+    sync is read in full, streamed to disk a chunk at a time.
+    Args:
+        table: str, one of keys
+        refresh: bool to discard the snapshot and read all rows
     Returns:
         pd.DataFrame"""
-    return pd.read_sql(query, psql_connect(config, secrets))
+    oid = table_oid(table)
+    snapshot = None if refresh else read_snapshot(table, oid)
+    key = keys[table]
+    if snapshot is None:
+        stream_snapshot(table, oid, dtypes[table])
+        return apply_dtypes(read_snapshot(table), dtypes[table])
+    db_keys = psql_to_pandas(f'SELECT {key} FROM {table};')[key]
+    kept = snapshot[key].isin(db_keys)
+    new_keys = db_keys[~db_keys.isin(snapshot[key])].tolist()
+    if kept.all() and not new_keys:
+        return apply_dtypes(snapshot, dtypes[table])  # Streamed snapshots hold categories as strings.
+    new_rows = psql_to_pandas(f'SELECT * FROM {table} WHERE {key} = ANY(%(keys)s) ORDER BY {key};',
+                              {'keys': new_keys}, dtypes=dtypes[table])
+    df = apply_dtypes(pd.concat([snapshot[kept], new_rows], ignore_index=True), dtypes[table])
+    write_snapshot(df, table, oid)
+    return df
 
 
-def get_dfs():
+def get_dfs(incremental=True):
     """Method that reads the three tables from PSQL.
+    Args:
+        incremental: bool. If True, tables are read through their
+            local snapshots (see sync_table); if False, in full.
     Returns:
         (pd.DataFrame,) * 3"""
-    df1 = psql_to_pandas('SELECT * FROM main;')
-    df2 = psql_to_pandas('SELECT * FROM imgs;')
-    df3 = psql_to_pandas('SELECT * FROM bids;')
+    if incremental:
+        return tuple(sync_table(table) for table in ('main', 'imgs', 'bids'))
+    df1 = psql_to_pandas('SELECT * FROM main;', dtypes=dtypes['main'])
+    df2 = psql_to_pandas('SELECT * FROM imgs;', dtypes=dtypes['imgs'])
+    df3 = psql_to_pandas('SELECT * FROM bids;', dtypes=dtypes['bids'])
     return df1, df2, df3
@@ -1,80 +1,218 @@
+import os
 import string
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import joblib
 import nltk
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
 
 from nltk.corpus import stopwords
 from nltk.tokenize import RegexpTokenizer
 from nltk.stem import WordNetLemmatizer
-from sklearn.feature_extraction.text import CountVectorizer, TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from data_collection.misc import read_yaml
 
 nltk.download('stopwords')
 nltk.download('wordnet')
 
+folder = os.path.dirname(__file__)
+config_file = os.path.join(folder, '..', 'conf.yaml')
+config = read_yaml(config_file)
+feature_store_path = config['feature_store_path']
+drift_threshold = config.get('tfidf_drift_threshold', 0.1)
 
-def nlp_preprocess(text_df, verbose=False):
-    """Method performing a common Bag-of-Words data_readiness routine.
-    All steps taken here include removing punctuation, removing
-    stop words, lemmatizing, and a check to see if 'super smash
-    bros melee' is in the string. The last of these could likely
-    be a relevant feature. Resulting word list is then filtered
-    based on tf-idf in a CountVectorizer.
-    Args:
-        text_df: pd.DataFrame
-        verbose: bool
-    Returns:
-        (list, np.array) where the list contains feature names from bag-of-words
-        and the numpy array is an indicator matrix for features."""
-    def remove_punctuation(text):
-        no_punct = "".join([c for c in text if c not in string.punctuation])
-        return no_punct
+# Built once: stopwords.words() re-reads the corpus file on every call.
+# 'not' and 'no' are kept since they flip the meaning of a listing.
+STOPWORDS = frozenset(stopwords.words('english')) - {'not', 'no'}
+PUNCT_TABLE = str.maketrans('', '', string.punctuation)
+lemmatizer = WordNetLemmatizer()
+tokenizer = RegexpTokenizer(r'\w+')
 
-    def remove_stops(text):
-        no_stops = [w for w in text if (w not in stopwords.words('english') or w in ['not', 'no'])]
-        return no_stops
 
-    lemmatizer = WordNetLemmatizer()
+@lru_cache(maxsize=None)
+def lemmatize(word):
+    """Memoized WordNet lemma of word. Listing vocabulary is small and
+    repetitive, so nearly every lookup after the first few hundred
+    descriptions is a cache hit."""
+    return lemmatizer.lemmatize(word)
 
-    def word_lemmatizer(text):
-        lem_text = [lemmatizer.lemmatize(i) for i in text]
-        return lem_text
 
-    def is_in_check(text, words):
-        for word in words:
-            if word not in text:
-                return 0
-        return 1
+def preprocess_text(text):
+    """Removes punctuation, tokenizes, lemmatizes and removes stop
+    words from a single description, in one pass over its tokens.
+    Args:
+        text: str
+    Returns:
+        str of the remaining words, space separated."""
+    tokens = tokenizer.tokenize(text.translate(PUNCT_TABLE).lower())
+    return " ".join([word for word in map(lemmatize, tokens) if word not in STOPWORDS])
 
-    tokenizer = RegexpTokenizer(r'\w+')
 
-    text_df = text_df.apply(remove_punctuation)
-    text_df = text_df.apply(lambda x: tokenizer.tokenize(x.lower()))
-    text_df = text_df.apply(word_lemmatizer)
-    text_df = text_df.apply(remove_stops)
-    text = [" ".join(x) for x in text_df]
+def preprocess_texts(texts, n_jobs=None, chunksize=500):
+    """Runs preprocess_text over many descriptions. Large corpora are
+    split into chunks across a process pool; small ones stay in
+    process, where pool start-up would cost more than it saves.
+    Args:
+        texts: iterable of str
+        n_jobs: int of worker processes, or None for one per core
+        chunksize: int of descriptions sent to a worker at a time
+    Returns:
+        [str, ..., str] in the order of texts"""
+    texts = list(texts)
+    n_jobs = n_jobs or os.cpu_count() or 1
+    if n_jobs <= 1 or len(texts) < 2 * chunksize:
+        return [preprocess_text(text) for text in texts]
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        return list(pool.map(preprocess_text, texts, chunksize=chunksize))
+
+
+def fit_vectorizer(text, verbose=False):
+    """Fits the tf-idf vectorizer used for the BoW features.
+    Args:
+        text: [str, ..., str] of preprocessed descriptions
+        verbose: bool
+    Returns:
+        (TfidfVectorizer, scipy.sparse matrix)"""
     vectorizer = TfidfVectorizer(min_df=0.02, max_df=0.65, ngram_range=(1, 2))
     X = vectorizer.fit_transform(text)
     if verbose:
         print("NLP BoW Features:\n")
         print(len(vectorizer.get_feature_names()))
         print(vectorizer.get_feature_names())
-    text_df = text_df.apply(is_in_check, args=(['super', 'smash', 'bros', 'melee'],))
-    return (vectorizer.get_feature_names() + ['super smash bros melee'],
-            np.concatenate([X.toarray(), np.array(text_df).reshape(X.shape[0], 1)], axis=1))
+    return vectorizer, X
 
 
-def get_nlp_df(df, **kwargs):
-    """Calls the nlp_preprocess method and pushes
-    output into a dataframe for easy joining.
+def melee_check(text):
+    """Column of 1's where every word of 'super smash bros melee' is in
+    the preprocessed description, else 0's.
+    Args:
+        text: [str, ..., str] of preprocessed descriptions
+    Returns:
+        np.array of shape (len(text), 1)"""
+    def is_in_check(text, words):
+        tokens = set(text.split())
+        for word in words:
+            if word not in tokens:
+                return 0
+        return 1
+
+    in_check = [is_in_check(doc, ['super', 'smash', 'bros', 'melee']) for doc in text]
+    return np.array(in_check).reshape(len(text), 1)
+
+
+class TfidfFeatureStore:
+    """Persisted NLP features, so new listings don't refit the whole
+    corpus. Holds the fitted vectorizer (vocabulary and idf) and the
+    feature row of every id seen so far, under path. Ids without a
+    stored row are preprocessed and transformed with the stored
+    vectorizer; the vectorizer is only refit on request, or when new
+    descriptions drift from its vocabulary (see drift). All of it is
+    saved as one bundle, replaced atomically, so an interrupted save
+    can't leave a vectorizer, matrix and ids that don't match.
+    Args:
+        path: str of the store directory
+        drift_threshold: float, the rise in out-of-vocabulary token
+            rate over the fit corpus that triggers a refit."""
+    def __init__(self, path=feature_store_path, drift_threshold=drift_threshold):
+        self.path = path
+        self.drift_threshold = drift_threshold
+        self.vectorizer = None
+        self.baseline_oov = 0.0
+        self.ids = np.array([], dtype='int64')
+        self.X = None
+        if os.path.exists(self._file('store.joblib')):
+            state = joblib.load(self._file('store.joblib'))
+            self.vectorizer, self.baseline_oov = state['vectorizer'], state['baseline_oov']
+            self.X, self.ids = state['X'].tocsr(), state['ids']
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    @property
+    def columns(self):
+        return self.vectorizer.get_feature_names() + ['super smash bros melee']
+
+    def oov_rate(self, text):
+        """Share of words in text outside the vectorizer vocabulary."""
+        vocab = self.vectorizer.vocabulary_
+        words = [word for doc in text for word in doc.split()]
+        if not words:
+            return 0.0
+        return sum(word not in vocab for word in words) / len(words)
+
+    def drift(self, text):
+        """Rise in out-of-vocabulary rate of text over the fit corpus."""
+        return self.oov_rate(text) - self.baseline_oov
+
+    def _rows(self, X, text):
+        return sp.hstack([X, sp.csr_matrix(melee_check(text))], format='csr')
+
+    def fit(self, ids, text, verbose=False):
+        """Refits the vectorizer on text and replaces every stored row."""
+        self.vectorizer, X = fit_vectorizer(text, verbose)
+        self.baseline_oov = self.oov_rate(text)
+        self.ids = np.asarray(ids, dtype='int64')
+        self.X = self._rows(X, text)
+        return None
+
+    def save(self):
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        path = self._file('store.joblib')
+        joblib.dump({'vectorizer': self.vectorizer, 'baseline_oov': self.baseline_oov,
+                     'X': self.X, 'ids': self.ids}, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        return None
+
+    def features(self, ids, texts, refit=False, verbose=False, n_jobs=None):
+        """Feature rows for ids, transforming only the ids not stored yet.
+        Args:
+            ids: pd.Series of int ids
+            texts: pd.Series of raw descriptions, aligned with ids
+            refit: bool to refit the vectorizer on all of texts
+            verbose: bool
+            n_jobs: int passed to preprocess_texts
+        Returns:
+            (list, scipy.sparse.csr_matrix) of feature names and the
+            rows of ids, in order."""
+        ids = np.asarray(ids, dtype='int64')
+        texts = np.asarray(texts, dtype=object)
+        if refit or self.vectorizer is None:
+            self.fit(ids, preprocess_texts(texts, n_jobs=n_jobs), verbose)
+            self.save()
+        else:
+            new = ~np.isin(ids, self.ids)
+            if new.any():
+                new_ids = ids[new]
+                text = preprocess_texts(texts[new], n_jobs=n_jobs)
+                if self.drift(text) > self.drift_threshold:
+                    print('Description vocabulary has drifted; refitting tf-idf features.')
+                    return self.features(ids, texts, refit=True, verbose=verbose, n_jobs=n_jobs)
+                self.ids = np.concatenate([self.ids, new_ids])
+                self.X = sp.vstack([self.X, self._rows(self.vectorizer.transform(text), text)], format='csr')
+                self.save()
+        positions = pd.Series(np.arange(len(self.ids)), index=self.ids)
+        return self.columns, self.X[positions.loc[ids].values]
+
+
+def get_nlp_df(df, refit=False, **kwargs):
+    """Gets the NLP features of df from the feature store and pushes
+    them into a dataframe for easy joining. The feature columns are
+    pandas sparse columns, so the matrix is never densified.
     Args:
         df: pd.DataFrame (the main dataframe)
+        refit: bool to refit the tf-idf vectorizer on all of df
+        **kwargs: passed to TfidfFeatureStore.features
     Returns:
         df: pd.DataFrame (dataframe made through
         nlp process)"""
-    ids = df.id
-    cols, data = nlp_preprocess(df.text, **kwargs)
-    nlp_df = pd.DataFrame(data=data, columns=cols)
-    nlp_df['id'] = ids
+    cols, X = TfidfFeatureStore().features(df.id, df.text, refit=refit, **kwargs)
+    nlp_df = pd.DataFrame.sparse.from_spmatrix(X, columns=cols)
+    nlp_df['id'] = df.id.values
 
     rename_cols = []
     for col in nlp_df.columns:
@@ -92,3 +230,11 @@ def nlp_join(df, nlp_df):
     Returns:
         pd.DataFrame"""
     return df.merge(nlp_df, on='id', how='left')
+
+
+if __name__ == '__main__':
+    # Explicit refit of the tf-idf feature store on every listing.
+    from data_readiness.read_db import sync_table
+
+    df = sync_table('main')
+    get_nlp_df(df, refit=True, verbose=True)
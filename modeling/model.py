@@ -19,23 +19,23 @@ from data_collection.misc import read_yaml
 folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '..', 'conf.yaml')
 config = read_yaml(config_file)
-csv_path = config['csv_path']
-data_path = csv_path + 'train.csv'
+data_path = prep.data_path
 
 # Control whether we search for hyper-parameters
 hyper_param_search = False
 
 # Read in data and handle missing values.
-df = prep.read_data(data_path)
+df = prep.read_data(data_path, exclude=prep.drop_cols)
 df_clean = prep.handle_missing(df)
 
-# Split into X, y.
+# Split into X, y. X stays sparse; see prep.to_matrix for column order.
 features = [col for col in df_clean.columns if col != 'price']
-X = df_clean[features]
+X, features = prep.to_matrix(df_clean[features])
 y = df_clean['price']
 
-# Standardize features
-scaler = StandardScaler()
+# Standardize features. Centering would densify X; ElasticNet fits an
+# intercept, so scaling alone gives the same coefficients.
+scaler = StandardScaler(with_mean=False)
 scaler.fit(X)
 X = scaler.transform(X)
 
@@ -1,6 +1,9 @@
 import os
 
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
+import scipy.sparse as sp
 
 from data_collection.misc import read_yaml
 
@@ -8,22 +11,107 @@ folder = os.path.dirname(__file__)
 config_file = os.path.join(folder, '..', 'conf.yaml')
 config = read_yaml(config_file)
 csv_path = config['csv_path']
-data_path = csv_path + 'train.csv'
+train_format = config.get('train_format', 'parquet')
+data_path = csv_path + ('train.parquet' if train_format == 'parquet' else 'train.csv')
+nlp_path = csv_path + 'train_nlp.npz'
 
+# Columns handle_missing drops; no need to read them in at all.
+drop_cols = ['id', 'bundle', 'text', 'bid_summary']
 
-def read_data(data_path=data_path):
-    """Method that reads in csv data at path determined in config.yaml.
+
+def sparse_columns(df) -> list:
+    """Names of the pandas sparse columns of df."""
+    return [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+
+
+def write_sparse_frame(df, path: str):
+    """Writes the sparse columns of df, plus its index, to a compressed
+    .npz file in CSR form. Pairs with read_sparse_frame.
+    Args:
+        df: pd.DataFrame whose columns are all sparse
+        path: str of the .npz file
+    Returns:
+        None"""
+    X = df.sparse.to_coo().tocsr()
+    np.savez_compressed(path, data=X.data, indices=X.indices, indptr=X.indptr, shape=X.shape,
+                        columns=np.array(df.columns, dtype=str), index=df.index.values)
+    return None
+
+
+def read_sparse_frame(path: str) -> pd.DataFrame:
+    """Reads a file written by write_sparse_frame back into a
+    dataframe of sparse columns, with its original index.
+    Args:
+        path: str of the .npz file
+    Returns:
+        pd.DataFrame"""
+    with np.load(path) as f:
+        X = sp.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+        return pd.DataFrame.sparse.from_spmatrix(X, index=f['index'], columns=list(f['columns']))
+
+
+def read_parquet(data_path, exclude=()):
+    """Reads a Parquet dataset memory-mapped, projecting out the
+    columns in exclude so they are never read from disk. Dtypes
+    (e.g. categories) and the index are preserved as written.
+    Args:
+        data_path: str
+        exclude: [str, ..., str] of columns to skip
+    Returns:
+        pd.DataFrame"""
+    names = pq.read_schema(data_path).names
+    columns = [col for col in names if col not in exclude and not col.startswith('__index_level_')]
+    table = pq.read_table(data_path, columns=columns, memory_map=True, use_pandas_metadata=True)
+    return table.to_pandas()
+
+
+def read_data(data_path=data_path, nlp_path=nlp_path, exclude=()):
+    """Method that reads in the training data at path determined in
+    config.yaml, as Parquet or csv depending on its extension.
     If no file is present, will throw an error. Need to run main.py
-    in data_readiness folder to make csv."""
+    in data_readiness folder to make it. The NLP features are read
+    from their side-car .npz, if present, as sparse columns.
+    Args:
+        data_path: str
+        nlp_path: str
+        exclude: [str, ..., str] of columns to skip (Parquet only)
+    Returns:
+        pd.DataFrame"""
     try:
-        df = pd.read_csv(data_path, index_col=0)
+        if data_path.endswith('.parquet'):
+            df = read_parquet(data_path, exclude)
+        else:
+            df = pd.read_csv(data_path, index_col=0)
     except FileNotFoundError:
         print("""No data file detected! 
         Try running the main script in "data_readiness""""")
         exit(1)
+    # Parquet keeps the nullable Int dtypes of the snapshot (e.g. Int32
+    # rating_count); handle_missing and to_matrix expect NaN-able floats.
+    nullable_ints = [col for col in df.columns
+                     if pd.api.types.is_extension_array_dtype(df[col].dtype)
+                     and pd.api.types.is_integer_dtype(df[col].dtype)]
+    df[nullable_ints] = df[nullable_ints].astype('float64')
+    if os.path.exists(nlp_path):
+        df = pd.concat([df, read_sparse_frame(nlp_path)], axis=1)
     return df
 
 
+def to_matrix(df):
+    """Converts a feature dataframe into a scipy CSR matrix without
+    densifying its sparse columns. Dense columns come first.
+    Args:
+        df: pd.DataFrame of numeric or categorical columns
+    Returns:
+        (scipy.sparse.csr_matrix, list) of the matrix and its column names"""
+    sparse_cols = sparse_columns(df)
+    dense_cols = [col for col in df.columns if col not in sparse_cols]
+    blocks = [sp.csr_matrix(df[dense_cols].astype(float).values)]
+    if sparse_cols:
+        blocks.append(df[sparse_cols].sparse.to_coo())
+    return sp.hstack(blocks, format='csr'), dense_cols + sparse_cols
+
+
 def handle_missing(df):
     """Method to handle all missing values on a
     per column basis. See data_handling_notes.txt
@@ -35,8 +123,7 @@ def handle_missing(df):
     Returns:
         df: pd.DataFrame"""
     def _drop_cols(df):
-        cols = ['id', 'bundle', 'text', 'bid_summary']
-        return df.drop(columns=cols)
+        return df.drop(columns=drop_cols, errors='ignore')
 
     def _cond(df):
         return pd.get_dummies(df, columns=['cond'])